@@ -0,0 +1,192 @@
+"""Admission control for LLM calls"""
+import asyncio
+import logging
+import math
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(HTTPException):
+    """Request turned away before reaching the model; carries Retry-After"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(status_code=status_code, detail=detail, headers={"Retry-After": str(retry_after)})
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Global cap on in-flight LLM calls with a bounded, deadline-limited wait queue.
+
+    Calls beyond `max_in_flight` wait in FIFO order. If `max_waiting` calls
+    are already queued, or a call can't get a slot within `wait_timeout`
+    seconds, it is rejected with 503 and a Retry-After estimated from recent
+    call durations.
+    """
+
+    def __init__(self, max_in_flight: int, max_waiting: int, wait_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._avg_duration = 2.0  # EWMA of slot hold time in seconds
+
+    def retry_after(self) -> int:
+        backlog = (self.waiting + 1) / self.max_in_flight
+        return max(1, math.ceil(self._avg_duration * backlog))
+
+    def _reject(self, detail: str) -> AdmissionRejected:
+        self.rejected += 1
+        return AdmissionRejected(503, detail, self.retry_after())
+
+    def check(self):
+        """Fail fast if a new call would be rejected for a full queue right now"""
+        if self._semaphore.locked() and self.waiting >= self.max_waiting:
+            raise self._reject("AI service is busy, please retry shortly")
+
+    async def acquire(self):
+        self.check()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.wait_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject("AI service is busy, please retry shortly")
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def release(self, duration: Optional[float] = None):
+        self.in_flight -= 1
+        self._semaphore.release()
+        if duration is not None:
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+
+class MongoLeases:
+    """Named, expiring locks shared by every worker through a MongoDB collection.
+
+    A lease is a document {_id: name, holder, expires_at}. Taking one is a
+    single upsert matching only an expired lease, so while another holder's
+    lease is live the upsert fails on the duplicate _id. `collection` is
+    looked up on each call so tests can swap the database.
+    """
+
+    def __init__(self, collection: Callable):
+        self.collection = collection
+
+    async def try_acquire(self, name: str, seconds: float, holder: str) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection().find_one_and_update(
+                {"_id": name, "expires_at": {"$lt": now}},
+                {"$set": {"expires_at": now + timedelta(seconds=seconds), "holder": holder}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False  # someone else holds an unexpired lease
+
+    async def release(self, name: str, holder: str):
+        await self.collection().delete_one({"_id": name, "holder": holder})
+
+
+class SessionSerializer:
+    """Runs turns of the same chat session strictly one at a time.
+
+    At most `max_pending` turns may wait behind the running one; more are
+    rejected with 429, as are turns that wait longer than `wait_timeout`.
+    Locks are dropped once no turn holds or waits for them.
+
+    With `leases`, a turn that holds the local lock also takes a
+    `lease_seconds` lease on the session, polling until other workers'
+    turns finish, so turns are serialized across processes too.
+    """
+
+    def __init__(self, max_pending: int, wait_timeout: float, leases: Optional[MongoLeases] = None,
+                 lease_seconds: float = 120.0, poll_interval: float = 0.1):
+        self.max_pending = max_pending
+        self.wait_timeout = wait_timeout
+        self.leases = leases
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._locks = {}  # session_id -> [lock, holders + waiters, lease holder token]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    async def acquire(self, session_id: str):
+        deadline = time.monotonic() + self.wait_timeout
+        entry = self._locks.get(session_id)
+        if entry is None:
+            entry = self._locks[session_id] = [asyncio.Lock(), 0, None]
+        if entry[1] > self.max_pending:
+            raise AdmissionRejected(429, "Previous message in this conversation is still being answered", 2)
+        entry[1] += 1
+        try:
+            await asyncio.wait_for(entry[0].acquire(), timeout=self.wait_timeout)
+        except asyncio.TimeoutError:
+            self._leave(session_id, entry)
+            raise AdmissionRejected(429, "Previous message in this conversation is still being answered", 2)
+        except BaseException:
+            self._leave(session_id, entry)
+            raise
+        if self.leases is not None:
+            try:
+                entry[2] = await self._acquire_lease(session_id, deadline)
+            except BaseException:
+                entry[0].release()
+                self._leave(session_id, entry)
+                raise
+
+    async def _acquire_lease(self, session_id: str, deadline: float) -> str:
+        token = uuid.uuid4().hex
+        while not await self.leases.try_acquire(f"turn:{session_id}", self.lease_seconds, token):
+            if time.monotonic() + self.poll_interval > deadline:
+                raise AdmissionRejected(429, "Previous message in this conversation is still being answered", 2)
+            await asyncio.sleep(self.poll_interval)
+        return token
+
+    async def release(self, session_id: str):
+        entry = self._locks[session_id]
+        token, entry[2] = entry[2], None
+        try:
+            if token is not None:
+                await self.leases.release(f"turn:{session_id}", token)
+        except Exception as e:
+            # The lease still expires after lease_seconds
+            logger.warning(f"Could not release turn lease for {session_id}: {e}")
+        finally:
+            entry[0].release()
+            self._leave(session_id, entry)
+
+    def _leave(self, session_id: str, entry: list):
+        entry[1] -= 1
+        if entry[1] == 0 and self._locks.get(session_id) is entry:
+            del self._locks[session_id]
+
+    @asynccontextmanager
+    async def turn(self, session_id: str):
+        await self.acquire(session_id)
+        try:
+            yield
+        finally:
+            await self.release(session_id)
@@ -0,0 +1,82 @@
+"""Compressed archives of inactive chat sessions.
+
+An archive document holds every archived message of one session as a single
+BSON array compressed with zstd, so a cold session costs one small document
+and one index entry instead of one of each per message. Archives written
+without the zstandard package installed fall back to zlib; the codec is
+recorded per document so either kind can be read back.
+"""
+import zlib
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import bson
+from bson.codec_options import CodecOptions
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always available
+    zstandard = None
+
+ZSTD_LEVEL = 10
+BSON_OPTIONS = CodecOptions(tz_aware=True)
+
+
+def compress(raw: bytes) -> Tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return "zlib", zlib.compress(raw, 9)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this chat archive")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def pack_messages(messages: List[dict]) -> dict:
+    """Archive fields (codec, data, counts, time range) for messages sorted oldest first"""
+    codec, data = compress(bson.encode({"messages": messages}))
+    return {
+        "codec": codec,
+        "data": bson.Binary(data),
+        "message_count": len(messages),
+        "first_timestamp": messages[0]["timestamp"],
+        "last_timestamp": messages[-1]["timestamp"],
+    }
+
+
+def unpack_messages(archive: dict) -> List[dict]:
+    """Messages stored in an archive document, oldest first"""
+    raw = decompress(archive["codec"], bytes(archive["data"]))
+    return bson.decode(raw, codec_options=BSON_OPTIONS)["messages"]
+
+
+def merge_messages(*groups: List[dict]) -> List[dict]:
+    """Union of message lists by id (later groups win), sorted by (timestamp, id)"""
+    by_id = {}
+    for group in groups:
+        for message in group:
+            by_id[message["id"]] = message
+    return sorted(by_id.values(), key=lambda m: (m["timestamp"], m["id"]))
+
+
+def merge_page(archived: List[dict], page: List[dict], has_more: bool, limit: int,
+               cursor: Optional[Tuple[datetime, str]] = None, forward: bool = False) -> Tuple[List[dict], bool]:
+    """Combine one keyset page of live messages with a session's archived messages.
+
+    `page` and `has_more` come from the live collection for the same cursor.
+    Live messages missing from the page all lie beyond it, so the `limit`
+    messages nearest the cursor among the page and the archive are the
+    correct page of the combined history.
+    """
+    if cursor is not None:
+        if forward:
+            archived = [m for m in archived if (m["timestamp"], m["id"]) > cursor]
+        else:
+            archived = [m for m in archived if (m["timestamp"], m["id"]) < cursor]
+    combined = merge_messages(archived, page)
+    more = has_more or len(combined) > limit
+    return (combined[:limit] if forward else combined[-limit:]), more
@@ -0,0 +1,175 @@
+"""In-process caches shared by the API handlers"""
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Size-bounded LRU mapping whose entries also expire after sitting idle.
+
+    Every read or write refreshes an entry's position, so the least recently
+    used entry is always at the front. That makes both size eviction and idle
+    expiry O(1) per removed entry.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, last_access)
+
+    def _expired(self, last_access: float, now: float) -> bool:
+        return self.ttl is not None and now - last_access > self.ttl
+
+    def prune(self) -> int:
+        """Drop idle entries and anything over maxsize; return how many went"""
+        now = time.monotonic()
+        removed = 0
+        while self._data:
+            key, (_, last_access) = next(iter(self._data.items()))
+            if len(self._data) <= self.maxsize and not self._expired(last_access, now):
+                break
+            del self._data[key]
+            removed += 1
+        return removed
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        now = time.monotonic()
+        if self._expired(entry[1], now):
+            del self._data[key]
+            return default
+        self._data[key] = (entry[0], now)
+        self._data.move_to_end(key)
+        return entry[0]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        self.prune()
+
+    def __getitem__(self, key: Hashable) -> Any:
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            raise KeyError(key)
+        return value
+
+    def __delitem__(self, key: Hashable):
+        del self._data[key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and not self._expired(entry[1], time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def mark_stale(payload: Any) -> Any:
+    """Default last-good view: a copy of a dict payload flagged `stale`"""
+    return {**payload, "stale": True} if isinstance(payload, dict) else payload
+
+
+class FeedCache:
+    """TTL cache for upstream feed payloads.
+
+    Fresh entries are served directly. Within the stale window the last good
+    payload is served while a single background refresh runs. Concurrent
+    misses for the same key share one upstream fetch (single-flight).
+
+    If a refresh fails (including when the provider's circuit breaker is
+    open), the last good payload is served through `stale_view`, however
+    old it is, rather than the error.
+
+    `refresh_interval(payload)`, when given, replaces `ttl` as the fresh
+    lifetime of each payload, so it can depend on the payload itself (a
+    live match) or on outside state (the provider's remaining quota).
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float = 0.0, maxsize: int = 64,
+                 stale_view: Callable[[Any], Any] = mark_stale,
+                 refresh_interval: Optional[Callable[[Any], float]] = None):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.refresh_interval = refresh_interval
+        self.stale_view = stale_view
+        self._entries = LRUCache(maxsize=maxsize)  # key -> (payload, fetched_at)
+        self._stale_views = LRUCache(maxsize=maxsize)  # key -> (payload, stale view of it)
+        self._inflight = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        payload = await fetch()
+        self._entries[key] = (payload, time.monotonic())
+        return payload
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"{self.name} refresh failed: {task.exception()}")
+
+    def _refresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return task
+
+    async def get(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached payload for key, calling fetch() only when needed"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            payload, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            ttl = self.refresh_interval(payload) if self.refresh_interval else self.ttl
+            if age < ttl:
+                self.hits += 1
+                return payload
+            if age < ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._refresh(key, fetch)
+                return payload
+
+        self.misses += 1
+        try:
+            # Shield so one caller going away doesn't cancel the shared fetch
+            return await asyncio.shield(self._refresh(key, fetch))
+        except Exception:
+            if entry is None:
+                raise
+            # The failure itself is logged when the refresh task finishes
+            self.fallbacks += 1
+            return self._last_good(key, entry[0])
+
+    def _last_good(self, key: Hashable, payload: Any) -> Any:
+        # Reuse the view while the payload is unchanged so its ETag stays stable
+        cached = self._stale_views.get(key)
+        if cached is None or cached[0] is not payload:
+            cached = self._stale_views[key] = (payload, self.stale_view(payload))
+        return cached[1]
+
+    async def refresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Fetch a new payload regardless of freshness, joining any in-flight fetch"""
+        return await asyncio.shield(self._refresh(key, fetch))
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key)
@@ -0,0 +1,116 @@
+"""Circuit breakers for upstream data APIs and the LLM"""
+import functools
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from admission import AdmissionRejected
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(AdmissionRejected):
+    """Call refused without trying because its dependency's breaker is open"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(503, f"Upstream {name} is temporarily unavailable, please retry shortly", retry_after)
+        self.name = name
+
+
+class CircuitBreaker:
+    """Stops calling a dependency that keeps failing or answering slowly.
+
+    After `failure_threshold` consecutive failed calls (or calls slower than
+    `slow_call_seconds`) the breaker opens and calls are refused at once with
+    CircuitOpen. After `reset_timeout` seconds it half-opens and lets
+    `half_open_probes` calls through: a success closes it again, a failure
+    re-opens it for another `reset_timeout`.
+
+    Our own load shedding (AdmissionRejected) and cancelled calls are not
+    counted as failures.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 slow_call_seconds: Optional[float] = None, half_open_probes: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.failures = 0  # consecutive failed or slow calls
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probes = 0
+
+    def retry_after(self) -> int:
+        remaining = self.opened_at + self.reset_timeout - time.monotonic()
+        return max(1, math.ceil(remaining))
+
+    def _reject(self) -> CircuitOpen:
+        self.rejected += 1
+        return CircuitOpen(self.name, self.retry_after())
+
+    def check(self):
+        """Raise CircuitOpen if a call made now would be refused"""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise self._reject()
+            self.state = HALF_OPEN
+            logger.info(f"Circuit {self.name} half-open, probing")
+        if self.state == HALF_OPEN and self._probes >= self.half_open_probes:
+            raise self._reject()
+
+    def record_success(self):
+        if self.state == HALF_OPEN:
+            logger.info(f"Circuit {self.name} closed")
+        if self.state != OPEN:
+            self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            logger.warning(f"Circuit {self.name} opened after {self.failures} failed or slow calls")
+
+    @asynccontextmanager
+    async def guard(self):
+        """Run the enclosed call through the breaker"""
+        self.check()
+        probe = self.state == HALF_OPEN
+        if probe:
+            self._probes += 1
+        start = time.monotonic()
+        try:
+            yield
+        except AdmissionRejected:
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        else:
+            slow = self.slow_call_seconds is not None and time.monotonic() - start > self.slow_call_seconds
+            if slow:
+                self.record_failure()
+            else:
+                self.record_success()
+        finally:
+            if probe:
+                self._probes -= 1
+
+    def protect(self, fn):
+        """Decorator running every call of an async function through the breaker"""
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            async with self.guard():
+                return await fn(*args, **kwargs)
+        return wrapper
@@ -0,0 +1,125 @@
+"""Conditional GET and pre-compressed bodies for cached JSON feeds"""
+import gzip
+import hashlib
+import json
+from typing import Any, Hashable, List
+
+from fastapi import Request, Response
+
+from cache import LRUCache
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+COMPRESS_MIN_BYTES = 1024
+
+
+class EncodedPayload:
+    """A payload serialized once, with its content hash and compressed bodies.
+
+    Compressed variants are built on first request and reused for as long as
+    the feed cache keeps returning the same payload object.
+    """
+
+    def __init__(self, payload: Any):
+        self.payload = payload
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self._bodies = {"identity": self.body}
+
+    def etag(self, coding: str) -> str:
+        # Strong ETags must differ between byte-different representations
+        return f'"{self.digest}"' if coding == "identity" else f'"{self.digest}-{coding}"'
+
+    def encoded(self, coding: str) -> bytes:
+        body = self._bodies.get(coding)
+        if body is None:
+            if coding == "br":
+                body = brotli.compress(self.body, quality=5)
+            else:
+                body = gzip.compress(self.body, compresslevel=6, mtime=0)
+            self._bodies[coding] = body
+        return body
+
+
+def accepted_encodings(header: str) -> List[str]:
+    """Content codings the client accepts (q > 0), lower-cased"""
+    codings = []
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            codings.append(name.strip().lower())
+    return codings
+
+
+def etag_matches(header: str, digest: str) -> bool:
+    """True if an If-None-Match header names any representation of digest"""
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        tag = tag.removeprefix("W/").strip('"')
+        if tag.split("-", 1)[0] == digest:
+            return True
+    return False
+
+
+class ConditionalJSON:
+    """Builds feed responses with ETag, Cache-Control and compression.
+
+    A request whose If-None-Match names the current payload gets an empty
+    304. Otherwise the body is sent brotli- or gzip-compressed when the
+    client accepts it and the body is at least `min_size` bytes.
+    """
+
+    def __init__(self, max_age: float, stale_while_revalidate: float = 0.0,
+                 min_size: int = COMPRESS_MIN_BYTES, maxsize: int = 64):
+        self.cache_control = f"public, max-age={int(max_age)}"
+        if stale_while_revalidate:
+            self.cache_control += f", stale-while-revalidate={int(stale_while_revalidate)}"
+        self.min_size = min_size
+        self._encoded = LRUCache(maxsize=maxsize)  # key -> EncodedPayload
+        self.not_modified = 0
+
+    def _encode(self, key: Hashable, payload: Any) -> EncodedPayload:
+        encoded = self._encoded.get(key)
+        if encoded is None or encoded.payload is not payload:
+            encoded = EncodedPayload(payload)
+            self._encoded[key] = encoded
+        return encoded
+
+    def _coding(self, request: Request, size: int) -> str:
+        if size < self.min_size:
+            return "identity"
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return "identity"
+
+    def respond(self, request: Request, key: Hashable, payload: Any) -> Response:
+        encoded = self._encode(key, payload)
+        coding = self._coding(request, len(encoded.body))
+        headers = {
+            "ETag": encoded.etag(coding),
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, encoded.digest):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(content=encoded.encoded(coding), media_type="application/json", headers=headers)
@@ -0,0 +1,37 @@
+"""Deferred imports for heavy optional-at-startup dependencies"""
+import importlib
+import threading
+from typing import Any
+
+
+class LazyImport:
+    """Stands in for a module attribute (typically a class) until first use.
+
+    Calling the stand-in imports the module, then forwards the call, so
+    `LlmChat = LazyImport("emergentintegrations.llm.chat", "LlmChat")` can be
+    used exactly like the class. `load()` may be run ahead of time, e.g. in a
+    worker thread during startup.
+    """
+
+    def __init__(self, module: str, name: str):
+        self.module = module
+        self.name = name
+        self._target = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._target is not None
+
+    def load(self) -> Any:
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    self._target = getattr(importlib.import_module(self.module), self.name)
+        return self._target
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<LazyImport {self.module}.{self.name}{'' if self.loaded else ' (not loaded)'}>"
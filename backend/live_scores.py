@@ -0,0 +1,121 @@
+"""Server-side live-score polling with delta fan-out to subscribers"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def diff_matches(previous: dict, current: dict) -> dict:
+    """Compare two {match_id: match} snapshots.
+
+    New matches are sent in full, changed ones as their id plus the fields
+    that differ, removed ones by id only.
+    """
+    added = []
+    updated = []
+    for match_id, match in current.items():
+        old = previous.get(match_id)
+        if old is None:
+            added.append(match)
+            continue
+        changed = {k: v for k, v in match.items() if old.get(k) != v}
+        changed.update({k: None for k in old if k not in match})
+        if changed:
+            updated.append({"id": match_id, **changed})
+    removed = [match_id for match_id in previous if match_id not in current]
+    return {"added": added, "updated": updated, "removed": removed}
+
+
+class LiveFeed:
+    """Polls one upstream feed on a schedule and pushes changes to subscribers.
+
+    Polling only runs while at least one client is subscribed, and there is
+    one poll per interval no matter how many clients are connected. Each
+    subscriber first receives a full snapshot, then only deltas. A
+    subscriber that falls too far behind is resynced with a new snapshot
+    instead of being sent a backlog.
+    """
+
+    def __init__(self, name: str, fetch: Callable[[], Awaitable[dict]], interval: float,
+                 queue_size: int = 16):
+        self.name = name
+        self.fetch = fetch
+        self.interval = interval
+        self.queue_size = queue_size
+        self.version = 0
+        self._matches = {}
+        self._subscribers = set()
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def snapshot(self) -> dict:
+        return {"type": "snapshot", "version": self.version, "matches": list(self._matches.values())}
+
+    async def subscribe(self) -> asyncio.Queue:
+        """Register a subscriber; its queue starts with a snapshot frame"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._ready.clear()
+            self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        queue.put_nowait(self.snapshot())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def _publish(self, frame: dict):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Too far behind to catch up on deltas; start it over
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self.snapshot())
+
+    def apply(self, payload: Any) -> Optional[dict]:
+        """Fold a fresh payload into the snapshot; return the delta frame if anything changed"""
+        current = {m["id"]: m for m in payload.get("matches", []) if m.get("id") is not None}
+        delta = diff_matches(self._matches, current)
+        self._matches = current
+        if not (delta["added"] or delta["updated"] or delta["removed"]):
+            return None
+        self.version += 1
+        return {"type": "delta", "version": self.version, **delta}
+
+    async def poll_once(self):
+        try:
+            payload = await self.fetch()
+        except Exception as e:
+            logger.warning(f"Live {self.name} poll failed: {e}")
+            return
+        frame = self.apply(payload)
+        if frame is not None and self._ready.is_set():
+            self._publish(frame)
+
+    async def _run(self):
+        logger.info(f"Live {self.name} poller started")
+        try:
+            while self._subscribers:
+                await self.poll_once()
+                self._ready.set()
+                await asyncio.sleep(self.interval)
+        finally:
+            self._ready.set()
+            logger.info(f"Live {self.name} poller stopped")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
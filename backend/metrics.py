@@ -0,0 +1,182 @@
+"""Prometheus metrics for the API, its upstreams, MongoDB and the LLM.
+
+Metrics are per worker process; scrape each worker (or run one worker per
+container) to get the full picture.
+"""
+import time
+from typing import Callable, Iterable, List, Tuple
+
+import httpx
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LLM_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+REQUEST_LATENCY = Histogram(
+    "bdask_http_request_duration_seconds",
+    "Time to produce a response (headers for streams), by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+UPSTREAM_LATENCY = Histogram(
+    "bdask_upstream_request_duration_seconds",
+    "Upstream data API call latency",
+    ["provider"],
+    buckets=LATENCY_BUCKETS
+)
+UPSTREAM_ERRORS = Counter(
+    "bdask_upstream_errors_total",
+    "Upstream data API calls that failed or returned an error status",
+    ["provider", "reason"]
+)
+
+MONGO_LATENCY = Histogram(
+    "bdask_mongo_command_duration_seconds",
+    "MongoDB command latency",
+    ["command"],
+    buckets=LATENCY_BUCKETS
+)
+MONGO_ERRORS = Counter(
+    "bdask_mongo_command_errors_total",
+    "MongoDB commands that failed",
+    ["command"]
+)
+
+LLM_LATENCY = Histogram(
+    "bdask_llm_request_duration_seconds",
+    "LLM call latency",
+    ["operation"],
+    buckets=LLM_BUCKETS
+)
+LLM_RESPONSE_CHARS = Histogram(
+    "bdask_llm_response_chars",
+    "LLM reply size in characters",
+    ["operation"],
+    buckets=(50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+)
+LLM_ERRORS = Counter(
+    "bdask_llm_errors_total",
+    "LLM calls that raised",
+    ["operation"]
+)
+
+LLM_IN_FLIGHT = Gauge(
+    "bdask_llm_in_flight",
+    "LLM calls currently holding an admission slot"
+)
+LLM_QUEUED = Gauge(
+    "bdask_llm_queued",
+    "LLM calls waiting for an admission slot"
+)
+CACHE_HIT_RATIO = Gauge(
+    "bdask_cache_hit_ratio",
+    "Fraction of cache lookups served without calling upstream",
+    ["cache"]
+)
+UPSTREAM_QUOTA_REMAINING = Gauge(
+    "bdask_upstream_quota_remaining",
+    "Requests left in today's budget for each provider's API key",
+    ["provider"]
+)
+CIRCUIT_STATE = Gauge(
+    "bdask_circuit_state",
+    "Circuit breaker state: 0 closed, 1 half-open, 2 open",
+    ["breaker"]
+)
+STARTUP_SECONDS = Gauge(
+    "bdask_startup_phase_seconds",
+    "Time this worker spent in each cold-start phase",
+    ["phase"]
+)
+CHAT_SESSIONS_CACHED = Gauge(
+    "bdask_chat_sessions_cached",
+    "LlmChat sessions currently held in memory"
+)
+
+UPSTREAM_PROVIDERS = {
+    "api.cricapi.com": "cricapi",
+    "newsdata.io": "newsdata",
+    "api.football-data.org": "football-data",
+    "v6.exchangerate-api.com": "exchangerate-api",
+}
+
+
+class RunningTotals:
+    """Exports running totals kept elsewhere (on caches, limiters, breakers) as a counter.
+
+    `read` is called at scrape time and yields (label values, total) pairs;
+    the metric is exposed as `<name>_total`.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: List[str],
+                 read: Callable[[], Iterable[Tuple[List[str], float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.read = read
+
+    def describe(self):
+        yield CounterMetricFamily(self.name, self.documentation, labels=self.labels)
+
+    def collect(self):
+        family = CounterMetricFamily(self.name, self.documentation, labels=self.labels)
+        for label_values, total in self.read():
+            family.add_metric(label_values, total)
+        yield family
+
+
+def register_totals(name: str, documentation: str, labels: List[str], read: Callable) -> RunningTotals:
+    collector = RunningTotals(name, documentation, labels, read)
+    REGISTRY.register(collector)
+    return collector
+
+
+def record_cache_stats(name: str, stats: dict, hit_keys: tuple):
+    """Publish the hit ratio derived from cumulative lookup counters"""
+    total = sum(stats.values())
+    hits = sum(stats[k] for k in hit_keys)
+    CACHE_HIT_RATIO.labels(name).set(hits / total if total else 0.0)
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """httpx transport wrapper that times every upstream call by provider"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        provider = UPSTREAM_PROVIDERS.get(request.url.host, request.url.host)
+        start = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except httpx.TimeoutException:
+            UPSTREAM_ERRORS.labels(provider, "timeout").inc()
+            raise
+        except httpx.TransportError:
+            UPSTREAM_ERRORS.labels(provider, "transport").inc()
+            raise
+        finally:
+            UPSTREAM_LATENCY.labels(provider).observe(time.perf_counter() - start)
+        if response.status_code >= 400:
+            UPSTREAM_ERRORS.labels(provider, str(response.status_code)).inc()
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener feeding the MongoDB latency histogram"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_LATENCY.labels(event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_LATENCY.labels(event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_ERRORS.labels(event.command_name).inc()
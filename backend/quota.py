@@ -0,0 +1,218 @@
+"""Request budgets for the upstream data APIs.
+
+Every request sent to a provider is counted against its API key's daily
+and per-minute limits. Daily counts are shared between workers through a
+MongoDB counter per provider and UTC day, so each worker sees the total
+for the key after every call it makes. Feed refresh intervals are
+stretched so the remaining daily budget lasts until the quota resets.
+"""
+import asyncio
+import functools
+import logging
+import math
+import time
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+import httpx
+from pymongo import ReturnDocument
+
+from admission import AdmissionRejected
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60.0
+
+
+class QuotaExhausted(AdmissionRejected):
+    """Upstream call skipped because the provider's request budget is used up"""
+
+    def __init__(self, provider: str, retry_after: int):
+        super().__init__(503, f"Upstream {provider} request budget exhausted, please retry later", retry_after)
+        self.provider = provider
+
+
+def seconds_until_reset(now: Optional[datetime] = None) -> float:
+    """Seconds until the next UTC midnight, when daily quotas reset"""
+    now = now or datetime.now(timezone.utc)
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), timezone.utc)
+    return (tomorrow - now).total_seconds()
+
+
+class ProviderQuota:
+    """Daily and per-minute request budget for one provider's API key.
+
+    `refresh_cost` is how many requests one feed refresh sends.
+    """
+
+    def __init__(self, provider: str, daily_limit: Optional[int] = None, per_minute: Optional[int] = None,
+                 refresh_cost: int = 1):
+        self.provider = provider
+        self.daily_limit = daily_limit
+        self.per_minute = per_minute
+        self.refresh_cost = refresh_cost
+        self.day = datetime.now(timezone.utc).date()
+        self.used_today = 0
+        self._recent = deque()  # monotonic times of calls in the last minute
+
+    def _roll(self):
+        today = datetime.now(timezone.utc).date()
+        if today != self.day:
+            self.day = today
+            self.used_today = 0
+        cutoff = time.monotonic() - MINUTE
+        while self._recent and self._recent[0] <= cutoff:
+            self._recent.popleft()
+
+    def record(self):
+        self._roll()
+        self.used_today += 1
+        self._recent.append(time.monotonic())
+
+    def sync(self, day: date, used: int):
+        """Adopt the shared count for `day` if it is ahead of ours"""
+        self._roll()
+        if day == self.day:
+            self.used_today = max(self.used_today, used)
+
+    def remaining_today(self) -> Optional[int]:
+        self._roll()
+        if self.daily_limit is None:
+            return None
+        return max(0, self.daily_limit - self.used_today)
+
+    def remaining_minute(self) -> Optional[int]:
+        self._roll()
+        if self.per_minute is None:
+            return None
+        return max(0, self.per_minute - len(self._recent))
+
+    def check(self, cost: Optional[int] = None):
+        """Raise QuotaExhausted if another refresh (or `cost` calls) would exceed a limit"""
+        cost = cost or self.refresh_cost
+        remaining = self.remaining_today()
+        if remaining is not None and remaining < cost:
+            raise QuotaExhausted(self.provider, math.ceil(seconds_until_reset()))
+        remaining = self.remaining_minute()
+        if remaining is not None and remaining < cost:
+            retry_after = self._recent[0] + MINUTE - time.monotonic() if self._recent else MINUTE
+            raise QuotaExhausted(self.provider, max(1, math.ceil(retry_after)))
+
+    def min_interval(self, cost: Optional[int] = None, horizon: Optional[float] = None, reserve: int = 0) -> float:
+        """Shortest refresh interval, in seconds, that keeps within both limits.
+
+        The daily budget is spread until the reset, or over `horizon` seconds
+        if that is sooner. `reserve` requests are left untouched while more
+        than that remain.
+        """
+        cost = cost or self.refresh_cost
+        interval = 0.0
+        if self.per_minute:
+            interval = MINUTE * cost / self.per_minute
+        remaining = self.remaining_today()
+        if remaining is not None:
+            usable = remaining - reserve if remaining > reserve else remaining
+            refreshes_left = usable // cost
+            until_reset = seconds_until_reset()
+            span = min(until_reset, horizon) if horizon else until_reset
+            interval = max(interval, span / refreshes_left if refreshes_left else until_reset)
+        return interval
+
+    def snapshot(self) -> dict:
+        return {
+            "dailyLimit": self.daily_limit,
+            "usedToday": self.used_today,
+            "remainingToday": self.remaining_today(),
+            "perMinuteLimit": self.per_minute,
+            "remainingThisMinute": self.remaining_minute(),
+            "minRefreshSeconds": round(self.min_interval(), 1),
+            "resetsInSeconds": int(seconds_until_reset())
+        }
+
+
+class UpstreamQuotas:
+    """Quota bookkeeping for every provider, keyed by provider name.
+
+    `usage` returns the MongoDB collection holding the shared daily
+    counters; it is looked up on each call so tests can swap the database.
+    """
+
+    def __init__(self, quotas: Dict[str, ProviderQuota], usage: Optional[Callable] = None):
+        self.quotas = quotas
+        self.usage = usage
+
+    def __getitem__(self, provider: str) -> ProviderQuota:
+        return self.quotas[provider]
+
+    def record(self, provider: str) -> bool:
+        """Count a call locally; True if the provider has a quota to share it with"""
+        quota = self.quotas.get(provider)
+        if quota is None:
+            return False
+        quota.record()
+        return self.usage is not None
+
+    async def publish(self, provider: str):
+        """Add a recorded call to the shared daily counter and adopt its total"""
+        quota = self.quotas[provider]
+        try:
+            doc = await self.usage().find_one_and_update(
+                {"provider": provider, "day": quota.day.isoformat()},
+                {"$inc": {"calls": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            quota.sync(date.fromisoformat(doc["day"]), doc["calls"])
+        except Exception as e:
+            logger.warning(f"Could not update shared {provider} usage: {e}")
+
+    async def load(self):
+        """Pick up today's counts from other workers, e.g. at startup"""
+        if self.usage is None:
+            return
+        day = datetime.now(timezone.utc).date()
+        async for doc in self.usage().find({"day": day.isoformat(), "provider": {"$in": list(self.quotas)}}):
+            self.quotas[doc["provider"]].sync(day, doc["calls"])
+
+    def guard(self, provider: str):
+        """Decorator refusing an upstream fetch that would overrun the provider's budget"""
+        def decorate(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                self.quotas[provider].check()
+                return await fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def snapshot(self) -> dict:
+        return {provider: quota.snapshot() for provider, quota in self.quotas.items()}
+
+
+class QuotaTransport(httpx.AsyncBaseTransport):
+    """httpx transport wrapper that counts every request a provider received.
+
+    The local count is immediate; the shared counter is updated through
+    `spawn`, so no request waits for a MongoDB round trip.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, quotas: UpstreamQuotas, providers: Dict[str, str],
+                 spawn: Callable = asyncio.ensure_future):
+        self._transport = transport
+        self._quotas = quotas
+        self._providers = providers  # host -> provider name
+        self._spawn = spawn
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        provider = self._providers.get(request.url.host)
+        try:
+            return await self._transport.handle_async_request(request)
+        except httpx.ConnectError:
+            provider = None  # never reached the provider
+            raise
+        finally:
+            if provider is not None and self._quotas.record(provider):
+                self._spawn(self._quotas.publish(provider))
+
+    async def aclose(self):
+        await self._transport.aclose()
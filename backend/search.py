@@ -0,0 +1,180 @@
+"""Search terms for Bengali, Banglish and English chat text.
+
+Every message is indexed under two kinds of term:
+  - exact terms: normalized tokens (NFC, no zero-width joiners, one spelling
+    of khanda ta, ASCII digits, case-folded Latin)
+  - fold terms ("~" prefix): a rough phonetic skeleton shared by a Bengali
+    word and its usual Banglish spellings, so "passport" finds "পাসপোর্ট"
+
+A query matches a message on any shared term; a word that matches exactly
+also matches on its fold term and so ranks above a transliterated match.
+Very common words are not indexed, and fold keys shorter than
+MIN_FOLD_KEY_LENGTH are dropped: two letters of skeleton are shared by too
+many unrelated words ("hello" and "হলো" both fold to "hl").
+"""
+import re
+import unicodedata
+from typing import List, Set, Tuple
+
+ZERO_WIDTH = dict.fromkeys(map(ord, "\u200b\u200c\u200d\u2060\ufeff"))
+BENGALI_DIGITS = {ord("০") + i: str(i) for i in range(10)}
+VIRAMA = "্"
+TOKEN_RE = re.compile("[0-9a-z\u0980-\u09ff]+")
+
+CONSONANTS = {
+    "ক": "k", "খ": "kh", "গ": "g", "ঘ": "gh", "ঙ": "ng",
+    "চ": "ch", "ছ": "ch", "জ": "j", "ঝ": "jh", "ঞ": "n",
+    "ট": "t", "ঠ": "th", "ড": "d", "ঢ": "dh", "ণ": "n",
+    "ত": "t", "থ": "th", "দ": "d", "ধ": "dh", "ন": "n",
+    "প": "p", "ফ": "ph", "ব": "b", "ভ": "bh", "ম": "m",
+    "য": "j", "র": "r", "ল": "l", "শ": "sh", "ষ": "sh",
+    "স": "s", "হ": "h", "ং": "ng", "ঃ": "h", "ঁ": "",
+}
+NUKTA_FORMS = {"ড়": "r", "ঢ়": "r", "য়": "y"}
+KSSA = "ক" + VIRAMA + "ষ"  # pronounced "kkh" (শিক্ষা = shikkha)
+YA_PHALA = VIRAMA + "য"  # doubles the consonant it follows (ধন্যবাদ = dhonnobad)
+VOWELS = {
+    "অ": "o", "আ": "a", "ই": "i", "ঈ": "i", "উ": "u", "ঊ": "u", "ঋ": "ri",
+    "এ": "e", "ঐ": "oi", "ও": "o", "ঔ": "ou",
+    "া": "a", "ি": "i", "ী": "i", "ু": "u", "ূ": "u", "ৃ": "ri",
+    "ে": "e", "ৈ": "oi", "ো": "o", "ৌ": "ou", VIRAMA: "",
+}
+MIN_FOLD_KEY_LENGTH = 3
+# Function words in Bengali, Banglish and English, as normalized tokens
+STOPWORDS = frozenset("""
+    আমি আমার আমরা তুমি তোমার আপনি আপনার সে তার তারা এই ওই সেই কি কী কে
+    না হয় হবে হলো ছিল আর ও এবং বা যে এটা ওটা কেন কোন এর একটি এক জন
+    ami amar amra tumi tomar apni apnar se tar tara ei oi ki ke na hoy hobe
+    holo chilo ar o ba je eta ota keno kon
+    the and or of to in on at is are was be it this that for with as an by
+""".split())
+LATIN_FOLDS = [
+    ("ck", "k"), ("cr", "kr"), ("cl", "kl"),  # English c = k, before "ch" becomes "c"
+    ("kh", "k"), ("gh", "g"), ("ch", "c"), ("jh", "j"), ("th", "t"), ("dh", "d"), ("ph", "f"), ("bh", "b"), ("sh", "s"), ("z", "j"), ("v", "b"), ("q", "k"),
+    ("x", "ks"), ("w", "o"), ("y", "i"),
+]
+
+
+def normalize_text(text: str) -> str:
+    """Canonical spelling used for indexing and querying"""
+    text = unicodedata.normalize("NFC", text).translate(ZERO_WIDTH)
+    text = text.replace("ৎ", "ত" + VIRAMA)  # khanda ta -> ta + hasant
+    return text.translate(BENGALI_DIGITS).casefold()
+
+
+def normalize_token(token: str) -> str:
+    # A trailing hasant is optional in practice ("হঠাৎ" / "হঠাত")
+    return token.rstrip(VIRAMA)
+
+
+def transliterate(token: str) -> str:
+    """Loose Latin rendering of a normalized Bengali token"""
+    out = []
+    i = 0
+    while i < len(token):
+        pair = token[i:i + 2]
+        if pair in NUKTA_FORMS:
+            out.append(NUKTA_FORMS[pair])
+            i += 2
+            continue
+        if token.startswith(KSSA, i):
+            out.append("kh")
+            i += len(KSSA)
+            continue
+        if pair == YA_PHALA and token[i + 1:i + 3] not in NUKTA_FORMS and out:
+            out.append(out[-1])
+            i += len(YA_PHALA)
+            continue
+        char = token[i]
+        out.append(CONSONANTS.get(char, VOWELS.get(char, char)))
+        i += 1
+    return "".join(out)
+
+
+def fold_key(token: str) -> str:
+    """Phonetic skeleton shared by Bengali and Banglish spellings of a word.
+
+    Aspirates and sibilants are merged, a leading vowel becomes "a" and other
+    vowels are dropped (Banglish spells the inherent vowel as "o", "a" or not
+    at all), then doubled letters are collapsed. A skeleton too short to tell
+    words apart keeps its "e", "i" and "u" ("shikkha" and "শিক্ষা" fold to
+    "sik"), then all vowels with "o" read as "a" ("dhaka" and "ঢাকা" fold to
+    "daka"). If even that is shorter than MIN_FOLD_KEY_LENGTH there is no key.
+    """
+    roman = transliterate(token)
+    for spelling, folded in LATIN_FOLDS:
+        roman = roman.replace(spelling, folded)
+    if not roman or not roman.isascii():
+        return ""
+    head = "a" if roman[0] in "aeiou" else roman[0]
+    for dropped in ("aeiou", "ao", ""):
+        body = "".join(c for c in roman[1:] if c not in dropped).replace("o", "a")
+        key = re.sub(r"(.)\1+", r"\1", head + body)
+        if len(key) >= MIN_FOLD_KEY_LENGTH:
+            return key
+    return ""
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalized tokens of at least two characters, without stopwords"""
+    tokens = []
+    for match in TOKEN_RE.finditer(normalize_text(text)):
+        token = normalize_token(match.group())
+        if len(token) >= 2 and token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def token_terms(token: str) -> List[str]:
+    terms = [token]
+    if not token.isdigit():
+        key = fold_key(token)
+        if key:
+            terms.append("~" + key)
+    return terms
+
+
+def index_terms(text: str) -> List[str]:
+    """Distinct search terms to store with a message"""
+    terms = set()
+    for token in tokenize(text):
+        terms.update(token_terms(token))
+    return sorted(terms)
+
+
+def query_terms(text: str) -> List[str]:
+    return index_terms(text)
+
+
+def snippet(text: str, terms: Set[str], width: int = 160) -> Tuple[str, List[List[int]]]:
+    """Excerpt of text around its first matching word, with [start, end) offsets of matches.
+
+    Offsets index into the returned excerpt, which is taken from the NFC form
+    of the text.
+    """
+    text = unicodedata.normalize("NFC", text)
+    spans = []
+    for match in re.finditer("[0-9A-Za-z\u0980-\u09ff\u200c\u200d]+", text):
+        token = normalize_token(normalize_text(match.group()))
+        if len(token) >= 2 and token not in STOPWORDS and any(term in terms for term in token_terms(token)):
+            spans.append((match.start(), match.end()))
+
+    if not spans or len(text) <= width:
+        start = 0
+    else:
+        start = max(0, spans[0][0] - width // 4)
+        # Begin on a word boundary
+        space = text.rfind(" ", 0, start)
+        start = space + 1 if space != -1 and start - space < 20 else start
+    end = min(len(text), start + width)
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        end = space if space > start else end
+
+    excerpt = text[start:end]
+    highlights = [[s - start, e - start] for s, e in spans if s >= start and e <= end]
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(text) else ""
+    if prefix:
+        highlights = [[s + 1, e + 1] for s, e in highlights]
+    return prefix + excerpt + suffix, highlights
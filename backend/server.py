@@ -1,22 +1,67 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+import time
+IMPORT_STARTED = time.perf_counter()  # the startup report counts module import time from here
+
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 import os
+import re
+import json
+import asyncio
 import logging
+import base64
+import hashlib
+import unicodedata
+import importlib.util
+import httpx
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional
 import uuid
-from datetime import datetime, timezone
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+import functools
+from datetime import datetime, timedelta, timezone
+from lazy_import import LazyImport
+from cache import LRUCache, FeedCache
+from http_cache import ConditionalJSON
+from search import index_terms, query_terms, snippet
+from archive import merge_messages, merge_page, pack_messages, unpack_messages
+from prayer_times import ASR_SCHOOLS, METHODS, PRAYERS, DISTRICTS, DISTRICT_INDEX, compute_year, find_district, format_minutes, hijri_date
+from write_behind import ChatWriteBehind
+from live_scores import LiveFeed
+from admission import AdmissionRejected, ConcurrencyLimiter, MongoLeases, SessionSerializer
+from circuit_breaker import STATE_VALUES, CircuitBreaker
+from quota import ProviderQuota, QuotaTransport, UpstreamQuotas
+from metrics import (
+    REQUEST_LATENCY, LLM_LATENCY, LLM_RESPONSE_CHARS, LLM_ERRORS, CHAT_SESSIONS_CACHED,
+    LLM_IN_FLIGHT, LLM_QUEUED, STARTUP_SECONDS, CIRCUIT_STATE, UPSTREAM_QUOTA_REMAINING,
+    UPSTREAM_PROVIDERS, InstrumentedTransport, MongoCommandMetrics, record_cache_stats, register_totals
+)
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# emergentintegrations brings in the Google GenAI/grpc stack, the slowest
+# import by far. It loads on first use, or in the background at startup
+# when LLM_PRELOAD is on, so the port opens without waiting for it.
+LlmChat = LazyImport("emergentintegrations.llm.chat", "LlmChat")
+UserMessage = LazyImport("emergentintegrations.llm.chat", "UserMessage")
+LLM_PRELOAD = os.environ.get('LLM_PRELOAD', 'true').lower() == 'true'
+
+# Token streaming for /chat/stream. The Emergent client only returns finished
+# replies, so tokens are streamed from the provider through litellm when a
+# provider key is set; without one the reply is sent in a single frame.
+LLM_STREAM_API_KEY = os.environ.get('LLM_STREAM_API_KEY') or os.environ.get('GEMINI_API_KEY')
+LLM_STREAM_MODEL = os.environ.get('LLM_STREAM_MODEL', 'gemini/gemini-3-flash-preview')
+LLM_STREAM_API_BASE = os.environ.get('LLM_STREAM_API_BASE') or None
+acompletion = LazyImport("litellm", "acompletion")
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, tz_aware=True, event_listeners=[MongoCommandMetrics()])
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
@@ -32,8 +77,235 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Store active chat sessions
-chat_sessions = {}
+# Where conversation state lives between turns:
+#   memory - LlmChat objects are cached per process (bounded by count and idle
+#            time) and rebuilt from chat_messages after eviction. Needs a
+#            single worker, or sticky sessions in front of several.
+#   mongo  - nothing is kept between turns; every turn rebuilds its context
+#            from MongoDB, so any worker on any node can serve any session.
+CHAT_SESSION_STORE = os.environ.get('CHAT_SESSION_STORE', 'memory').lower()
+if CHAT_SESSION_STORE not in ('memory', 'mongo'):
+    raise ValueError(f"CHAT_SESSION_STORE must be 'memory' or 'mongo', got {CHAT_SESSION_STORE!r}")
+if CHAT_SESSION_STORE == 'memory' and int(os.environ.get('WEB_CONCURRENCY', '1')) > 1:
+    logger.warning("CHAT_SESSION_STORE=memory with several workers: each worker keeps its own copy of a "
+                   "conversation and misses turns served by the others; set CHAT_SESSION_STORE=mongo")
+CHAT_SESSION_CACHE_SIZE = int(os.environ.get('CHAT_SESSION_CACHE_SIZE', '500'))
+CHAT_SESSION_IDLE_TTL = float(os.environ.get('CHAT_SESSION_IDLE_TTL', '1800'))
+chat_sessions = LRUCache(maxsize=CHAT_SESSION_CACHE_SIZE, ttl=CHAT_SESSION_IDLE_TTL)
+
+# Context policy: the model sees a rolling summary of older turns plus the
+# last CHAT_CONTEXT_RECENT_TURNS turns verbatim, capped at roughly
+# CHAT_CONTEXT_TOKEN_BUDGET tokens. Once a cached chat has accumulated twice
+# the recent window, or outgrown the budget, older turns are folded into the
+# summary in the background.
+CHAT_CONTEXT_RECENT_TURNS = int(os.environ.get('CHAT_CONTEXT_RECENT_TURNS', '10'))
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.environ.get('CHAT_CONTEXT_TOKEN_BUDGET', '6000'))
+CHAT_CONTEXT_SUMMARY = os.environ.get('CHAT_CONTEXT_SUMMARY', 'true').lower() == 'true'
+compacting_sessions = set()
+
+# LLM admission control: a global cap on in-flight model calls with a
+# bounded wait queue, and strict one-at-a-time turns per chat session
+llm_limiter = ConcurrencyLimiter(
+    max_in_flight=int(os.environ.get('LLM_MAX_IN_FLIGHT', '32')),
+    max_waiting=int(os.environ.get('LLM_MAX_QUEUE', '64')),
+    wait_timeout=float(os.environ.get('LLM_QUEUE_TIMEOUT', '10'))
+)
+# In mongo mode a session's turns are also serialized across workers
+# through a lease in the `leases` collection
+leases = MongoLeases(lambda: db.leases)
+session_turns = SessionSerializer(
+    max_pending=int(os.environ.get('CHAT_SESSION_MAX_PENDING', '2')),
+    wait_timeout=float(os.environ.get('CHAT_SESSION_WAIT_TIMEOUT', '60')),
+    leases=leases if CHAT_SESSION_STORE == 'mongo' else None,
+    lease_seconds=float(os.environ.get('CHAT_TURN_LEASE_SECONDS', '120'))
+)
+
+# Circuit breakers: after N consecutive failed or slow calls a provider is
+# skipped for a cool-down (feeds fall back to their last good payload), then
+# probed with a single call before traffic resumes
+UPSTREAM_BREAKER_FAILURES = int(os.environ.get('UPSTREAM_BREAKER_FAILURES', '5'))
+UPSTREAM_BREAKER_SLOW_SECONDS = float(os.environ.get('UPSTREAM_BREAKER_SLOW_SECONDS', '5'))
+UPSTREAM_BREAKER_RESET_SECONDS = float(os.environ.get('UPSTREAM_BREAKER_RESET_SECONDS', '30'))
+upstream_breakers = {
+    provider: CircuitBreaker(
+        provider,
+        failure_threshold=UPSTREAM_BREAKER_FAILURES,
+        reset_timeout=UPSTREAM_BREAKER_RESET_SECONDS,
+        slow_call_seconds=UPSTREAM_BREAKER_SLOW_SECONDS
+    )
+    for provider in ("cricapi", "newsdata", "football-data", "exchangerate-api")
+}
+llm_breaker = CircuitBreaker(
+    "gemini",
+    failure_threshold=int(os.environ.get('LLM_BREAKER_FAILURES', '5')),
+    reset_timeout=float(os.environ.get('LLM_BREAKER_RESET_SECONDS', '30')),
+    slow_call_seconds=float(os.environ.get('LLM_BREAKER_SLOW_SECONDS', '45'))
+)
+
+# Upstream request budgets per API key; an empty value means no limit. The
+# defaults are the providers' free plans (exchangerate-api: 1500 a month).
+# Daily counts are shared by all workers through `upstream_usage`.
+def optional_int(name: str, default: str) -> Optional[int]:
+    value = os.environ.get(name, default)
+    return int(value) if value else None
+
+upstream_quotas = UpstreamQuotas({
+    "cricapi": ProviderQuota("cricapi", daily_limit=optional_int('CRICKET_DAILY_QUOTA', '100')),
+    "newsdata": ProviderQuota("newsdata", daily_limit=optional_int('NEWS_DAILY_QUOTA', '200')),
+    "football-data": ProviderQuota("football-data", per_minute=optional_int('FOOTBALL_MINUTE_QUOTA', '10')),
+    "exchangerate-api": ProviderQuota("exchangerate-api", daily_limit=optional_int('EXCHANGE_DAILY_QUOTA', '50')),
+}, usage=lambda: db.upstream_usage)
+
+# Cricket and football refresh at their cache TTL only while a match is in
+# progress, and at the idle TTL otherwise. Idle refreshes leave
+# LIVE_BUDGET_RESERVE of the daily budget for live play; live refreshes may
+# spend what is left over LIVE_BUDGET_WINDOW seconds instead of the whole day.
+CRICKET_IDLE_CACHE_TTL = float(os.environ.get('CRICKET_IDLE_CACHE_TTL', '900'))
+FOOTBALL_IDLE_CACHE_TTL = float(os.environ.get('FOOTBALL_IDLE_CACHE_TTL', '900'))
+LIVE_BUDGET_RESERVE = float(os.environ.get('LIVE_BUDGET_RESERVE', '0.5'))
+LIVE_BUDGET_WINDOW = float(os.environ.get('LIVE_BUDGET_WINDOW', '10800'))
+
+def paced(provider: str, interval: float, live: Optional[bool] = None) -> float:
+    """Stretch a refresh interval so the provider's budget lasts until its daily reset.
+
+    `live` is None for feeds without live periods, which spread the budget
+    evenly; otherwise it says whether a match is in progress.
+    """
+    quota = upstream_quotas[provider]
+    if live is None:
+        return max(interval, quota.min_interval())
+    if live:
+        return max(interval, quota.min_interval(horizon=LIVE_BUDGET_WINDOW))
+    reserve = int(quota.daily_limit * LIVE_BUDGET_RESERVE) if quota.daily_limit else 0
+    return max(interval, quota.min_interval(reserve=reserve))
+
+def cricket_refresh_interval(payload: dict) -> float:
+    live = any(m.get("matchStarted") and not m.get("matchEnded") for m in payload.get("matches", []))
+    return paced("cricapi", cricket_cache.ttl if live else CRICKET_IDLE_CACHE_TTL, live)
+
+def football_refresh_interval(payload: dict) -> float:
+    live = any(m.get("isLive") for m in payload.get("matches", []))
+    return paced("football-data", football_cache.ttl if live else FOOTBALL_IDLE_CACHE_TTL, live)
+
+# Upstream feed caches: (fresh seconds, extra seconds a stale payload may be
+# served while it refreshes in the background)
+cricket_cache = FeedCache(
+    "cricket",
+    ttl=float(os.environ.get('CRICKET_CACHE_TTL', '30')),
+    stale_ttl=float(os.environ.get('CRICKET_CACHE_STALE_TTL', '120')),
+    refresh_interval=cricket_refresh_interval
+)
+news_cache = FeedCache(
+    "news",
+    ttl=float(os.environ.get('NEWS_CACHE_TTL', '300')),
+    stale_ttl=float(os.environ.get('NEWS_CACHE_STALE_TTL', '900')),
+    refresh_interval=lambda payload: paced("newsdata", news_cache.ttl)
+)
+football_cache = FeedCache(
+    "football",
+    ttl=float(os.environ.get('FOOTBALL_CACHE_TTL', '60')),
+    stale_ttl=float(os.environ.get('FOOTBALL_CACHE_STALE_TTL', '240')),
+    refresh_interval=football_refresh_interval
+)
+exchange_cache = FeedCache(
+    "exchange",
+    ttl=float(os.environ.get('EXCHANGE_CACHE_TTL', '3600')),
+    stale_ttl=float(os.environ.get('EXCHANGE_CACHE_STALE_TTL', '10800')),
+    # /exchange/rates serves the summary, so flag that too
+    stale_view=lambda snapshot: {**snapshot, "stale": True, "summary": {**snapshot["summary"], "stale": True}},
+    refresh_interval=lambda snapshot: paced("exchangerate-api", exchange_cache.ttl)
+)
+
+# Feed responses carry content-hash ETags (If-None-Match -> 304), a
+# Cache-Control lifetime matching their feed cache, and are gzip/brotli
+# compressed once per payload
+FEED_COMPRESS_MIN_BYTES = int(os.environ.get('FEED_COMPRESS_MIN_BYTES', '1024'))
+feed_responses = {
+    feed_cache.name: ConditionalJSON(
+        max_age=feed_cache.ttl,
+        stale_while_revalidate=feed_cache.stale_ttl,
+        min_size=FEED_COMPRESS_MIN_BYTES
+    )
+    for feed_cache in (cricket_cache, news_cache, football_cache, exchange_cache)
+}
+
+# Translation cache: in-process LRU in front of the `translations` collection,
+# whose entries expire through a MongoDB TTL index
+TRANSLATION_CACHE_SIZE = int(os.environ.get('TRANSLATION_CACHE_SIZE', '5000'))
+TRANSLATION_CACHE_RETENTION_DAYS = float(os.environ.get('TRANSLATION_CACHE_RETENTION_DAYS', '90'))
+translation_cache = LRUCache(maxsize=TRANSLATION_CACHE_SIZE)
+translation_cache_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0}
+
+# Prayer times: one year x 64 districts table per (year, method, school),
+# computed on first use; day pages built from it are kept for reuse
+PRAYER_METHOD = os.environ.get('PRAYER_METHOD', 'karachi')
+PRAYER_ASR_SCHOOL = os.environ.get('PRAYER_ASR_SCHOOL', 'standard')
+PRAYER_HIJRI_ADJUSTMENT = int(os.environ.get('PRAYER_HIJRI_ADJUSTMENT', '0'))
+PRAYER_PAGE_CACHE_SIZE = int(os.environ.get('PRAYER_PAGE_CACHE_SIZE', '2048'))
+prayer_tables = LRUCache(maxsize=8)
+prayer_pages = LRUCache(maxsize=PRAYER_PAGE_CACHE_SIZE)
+prayer_responses = ConditionalJSON(max_age=3600, min_size=FEED_COMPRESS_MIN_BYTES)
+
+# Optional cache of replies to a new session's opening message. Keys carry a
+# hash of the system prompt, so when its embedded date rolls over lookups
+# move to a fresh keyspace and yesterday's entries age out.
+CHAT_RESPONSE_CACHE = os.environ.get('CHAT_RESPONSE_CACHE', 'false').lower() == 'true'
+CHAT_RESPONSE_CACHE_SIZE = int(os.environ.get('CHAT_RESPONSE_CACHE_SIZE', '1000'))
+CHAT_RESPONSE_CACHE_TTL = float(os.environ.get('CHAT_RESPONSE_CACHE_TTL', '21600'))
+CHAT_RESPONSE_CACHE_MAX_CHARS = int(os.environ.get('CHAT_RESPONSE_CACHE_MAX_CHARS', '200'))
+chat_response_cache = LRUCache(maxsize=CHAT_RESPONSE_CACHE_SIZE, ttl=CHAT_RESPONSE_CACHE_TTL)
+chat_response_cache_stats = {"hits": 0, "misses": 0}
+
+# Chat search scores at most the newest CHAT_SEARCH_CANDIDATES messages that
+# share a term with the query, so a common word can't make it scan the
+# whole history
+CHAT_SEARCH_CANDIDATES = int(os.environ.get('CHAT_SEARCH_CANDIDATES', '500'))
+
+# App-lifetime HTTP client shared by all upstream handlers so connections
+# (and their TLS sessions) are reused across requests
+http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared pooled HTTP client, creating it on first use"""
+    global http_client
+    if http_client is None or http_client.is_closed:
+        transport = httpx.AsyncHTTPTransport(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+        )
+        http_client = httpx.AsyncClient(
+            transport=QuotaTransport(
+                InstrumentedTransport(transport), upstream_quotas, UPSTREAM_PROVIDERS, spawn=spawn_background
+            ),
+            timeout=httpx.Timeout(10.0, connect=5.0)
+        )
+    return http_client
+
+# Archive tier: a periodic background pass packs the messages of sessions
+# idle for CHAT_ARCHIVE_AFTER_DAYS into one compressed chat_archives document
+# per session, and applies retention. 0 disables a rule.
+CHAT_ARCHIVE_AFTER_DAYS = float(os.environ.get('CHAT_ARCHIVE_AFTER_DAYS', '30'))
+CHAT_ARCHIVE_INTERVAL = float(os.environ.get('CHAT_ARCHIVE_INTERVAL', '3600'))
+CHAT_ARCHIVE_BATCH = int(os.environ.get('CHAT_ARCHIVE_BATCH', '200'))
+CHAT_ARCHIVE_SEARCH_LIMIT = int(os.environ.get('CHAT_ARCHIVE_SEARCH_LIMIT', '50'))
+# Sessions that never got a message, and sessions untouched this long (with their history)
+CHAT_EMPTY_SESSION_TTL_HOURS = float(os.environ.get('CHAT_EMPTY_SESSION_TTL_HOURS', '24'))
+CHAT_SESSION_RETENTION_DAYS = float(os.environ.get('CHAT_SESSION_RETENTION_DAYS', '0'))
+# status_checks expire through a MongoDB TTL index
+STATUS_CHECK_RETENTION_DAYS = float(os.environ.get('STATUS_CHECK_RETENTION_DAYS', '30'))
+archive_task: Optional[asyncio.Task] = None
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+# Optional write-behind buffer for chat persistence (started at app startup)
+CHAT_WRITE_BEHIND = os.environ.get('CHAT_WRITE_BEHIND', 'false').lower() == 'true'
+CHAT_WRITE_BEHIND_INTERVAL = float(os.environ.get('CHAT_WRITE_BEHIND_INTERVAL', '0.25'))
+chat_writer: Optional[ChatWriteBehind] = None
+
+# Keep references to fire-and-forget tasks so they aren't garbage collected
+background_tasks = set()
+
+# Seconds between SSE keep-alive comments while waiting on the model
+STREAM_HEARTBEAT_SECONDS = float(os.environ.get('STREAM_HEARTBEAT_SECONDS', '10'))
 
 # Define Models
 class StatusCheck(BaseModel):
@@ -62,6 +334,16 @@ class ChatResponse(BaseModel):
     response: str
     timestamp: datetime
 
+class ChatSearchResult(BaseModel):
+    session_id: str
+    session_title: Optional[str] = None
+    message_id: str
+    role: str
+    timestamp: datetime
+    snippet: str
+    highlights: List[List[int]]  # [start, end) offsets of matched words in snippet
+    score: int
+
 class ChatSession(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -82,6 +364,16 @@ class TranslationResponse(BaseModel):
     source: str
     target: str
 
+class BatchTranslationRequest(BaseModel):
+    segments: List[str] = Field(min_length=1, max_length=200)
+    source: str
+    target: str
+
+class BatchTranslationResponse(BaseModel):
+    translations: List[TranslationResponse]
+    source: str
+    target: str
+
 # Function to get dynamic system message with current date
 def get_system_message() -> str:
     """Get system message with current date"""
@@ -115,23 +407,444 @@ def get_system_message() -> str:
 
 সবসময় বিনয়ী, সহায়ক এবং সংক্ষিপ্ত উত্তর দিন। পুরানো বা অনুমানমূলক তথ্য দেবেন না।"""
 
-def get_or_create_chat(session_id: str) -> LlmChat:
-    """Get existing chat session or create a new one"""
-    if session_id not in chat_sessions:
-        api_key = os.environ.get('EMERGENT_LLM_KEY')
-        if not api_key:
-            raise ValueError("EMERGENT_LLM_KEY not found in environment variables")
+class ChatContext:
+    """A session's LlmChat, the number of turns not yet folded into its summary
+    and the estimated tokens of the summary and history it holds.
+
+    `summary` and `history` mirror what the LlmChat was primed with plus the
+    turns since, so streamed turns can send the same context to the provider.
+    """
+
+    def __init__(self, chat: LlmChat, turns: int, tokens: int = 0,
+                 summary: Optional[str] = None, history: Optional[List[dict]] = None):
+        self.chat = chat
+        self.turns = turns
+        self.tokens = tokens
+        self.summary = summary
+        self.history = history if history is not None else []
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate; Bengali script runs about 3 characters per token"""
+    return len(text) // 3 + 1
+
+def history_tokens(summary: Optional[str], history: List[dict]) -> int:
+    return (estimate_tokens(summary) if summary else 0) + sum(estimate_tokens(m["content"]) for m in history)
+
+SUMMARY_HEADER = "এখন পর্যন্ত কথোপকথনের সারসংক্ষেপ (পুরানো অংশ):"
+
+async def load_chat_context(session_id: str) -> tuple:
+    """Load (summary, recent messages, unsummarized turns) for rebuilding a session's LlmChat.
+
+    Recent messages are the newest turns after the summarized point, at most
+    CHAT_CONTEXT_RECENT_TURNS of them and within the token budget left after
+    the summary. The turn count is capped at the compaction threshold.
+    """
+    session = await db.chat_sessions.find_one(
+        {"id": session_id},
+        {"_id": 0, "context_summary": 1, "summarized_until": 1, "archived_at": 1}
+    ) or {}
+    summary = session.get("context_summary")
+    
+    query = {"session_id": session_id}
+    if session.get("summarized_until"):
+        query["timestamp"] = {"$gt": session["summarized_until"]}
+    messages = await db.chat_messages.find(
+        query,
+        {"_id": 0, "id": 1, "role": 1, "content": 1, "timestamp": 1}
+    ).sort("timestamp", -1).to_list(CHAT_CONTEXT_RECENT_TURNS * 4)
+    if session.get("archived_at") and len(messages) < CHAT_CONTEXT_RECENT_TURNS * 4:
+        archived = await archived_messages(session_id, since=session.get("summarized_until"))
+        messages = merge_messages(archived, messages)[::-1][:CHAT_CONTEXT_RECENT_TURNS * 4]
+    
+    budget = CHAT_CONTEXT_TOKEN_BUDGET - (estimate_tokens(summary) if summary else 0)
+    history = []
+    for m in messages[:CHAT_CONTEXT_RECENT_TURNS * 2]:
+        budget -= estimate_tokens(m["content"])
+        if budget < 0:
+            break
+        history.append({"role": m["role"], "content": m["content"]})
+    history.reverse()
+    # Start on a user turn so the model never sees an orphaned reply first
+    while history and history[0]["role"] != "user":
+        history.pop(0)
+    return summary, history, len(messages) // 2
+
+async def archived_messages(session_id: str, since: Optional[datetime] = None) -> List[dict]:
+    """The session's archived messages, oldest first, optionally only those after `since`"""
+    archive = await db.chat_archives.find_one({"session_id": session_id}, {"_id": 0, "codec": 1, "data": 1})
+    if archive is None:
+        return []
+    messages = unpack_messages(archive)
+    if since is not None:
+        messages = [m for m in messages if m["timestamp"] > since]
+    return messages
+
+def session_system_message(summary: Optional[str] = None) -> str:
+    system_message = get_system_message()  # Use dynamic system message
+    if summary:
+        system_message += f"\n\n{SUMMARY_HEADER}\n{summary}"
+    return system_message
+
+def new_session_chat(session_id: str, history: List[dict], summary: Optional[str] = None) -> LlmChat:
+    """Build a session's LlmChat primed with prior turns and summary"""
+    api_key = os.environ.get('EMERGENT_LLM_KEY')
+    if not api_key:
+        raise ValueError("EMERGENT_LLM_KEY not found in environment variables")
+    
+    return LlmChat(
+        api_key=api_key,
+        session_id=session_id,
+        system_message=session_system_message(summary),
+        initial_messages=list(history) or None
+    ).with_model("gemini", "gemini-3-flash-preview")
+
+async def get_chat_context(session_id: str) -> ChatContext:
+    """Get the session's cached chat or rebuild it from stored history.
+
+    Must be called before the current turn's user message is saved, otherwise
+    that message would be replayed as history.
+    """
+    context = chat_sessions.get(session_id) if CHAT_SESSION_STORE == 'memory' else None
+    if context is None:
+        summary, history, turns = await load_chat_context(session_id)
+        chat = new_session_chat(session_id, history, summary)
+        context = ChatContext(chat, turns=turns, tokens=history_tokens(summary, history),
+                              summary=summary, history=history)
+        if CHAT_SESSION_STORE == 'memory':
+            chat_sessions[session_id] = context
+            if history or summary:
+                logger.info(f"Rehydrated chat session {session_id} with {len(history)} messages")
+            else:
+                logger.info(f"Created new chat session: {session_id}")
+    
+    return context
+
+def record_chat_turn(session_id: str, context: ChatContext, message: str, reply: str):
+    """Count a completed turn and schedule compaction once the window or token budget overflows"""
+    context.turns += 1
+    context.tokens += estimate_tokens(message) + estimate_tokens(reply)
+    context.history += [{"role": "user", "content": message}, {"role": "assistant", "content": reply}]
+    over_budget = context.tokens > CHAT_CONTEXT_TOKEN_BUDGET
+    if over_budget:
+        # The next turn rebuilds the chat from stored history, trimmed to the budget
+        chat_sessions.pop(session_id)
+    if (CHAT_CONTEXT_SUMMARY and (context.turns >= CHAT_CONTEXT_RECENT_TURNS * 2 or over_budget)
+            and session_id not in compacting_sessions):
+        spawn_background(compact_chat_context(session_id))
+
+def normalize_prompt_text(text: str) -> str:
+    """Key form of a chat message: NFC, case-folded, single-spaced, no trailing punctuation"""
+    return " ".join(unicodedata.normalize("NFC", text).casefold().split()).rstrip(" ?!.।")
+
+def first_turn_cache_key(context: ChatContext, message: str) -> Optional[str]:
+    """Response-cache key for a session's opening message, or None if the turn isn't cacheable.
+
+    Only turns with nothing before them qualify; later in a conversation the
+    same words can need a different answer.
+    """
+    if not CHAT_RESPONSE_CACHE or len(message) > CHAT_RESPONSE_CACHE_MAX_CHARS:
+        return None
+    if context.turns:
+        return None
+    prompt_version = hashlib.sha256(get_system_message().encode("utf-8")).hexdigest()[:16]
+    digest = hashlib.sha256(normalize_prompt_text(message).encode("utf-8")).hexdigest()
+    return f"{prompt_version}:{digest}"
+
+def lookup_cached_reply(cache_key: Optional[str]) -> Optional[str]:
+    """Return a cached first-turn reply that is still within its TTL"""
+    if cache_key is None:
+        return None
+    # Entries expire CHAT_RESPONSE_CACHE_TTL after being stored, however often they're read
+    entry = chat_response_cache.get(cache_key)
+    if entry is None or entry[1] < time.monotonic():
+        chat_response_cache_stats["misses"] += 1
+        return None
+    chat_response_cache_stats["hits"] += 1
+    return entry[0]
+
+def store_cached_reply(cache_key: Optional[str], reply: str):
+    if cache_key is not None and reply.strip():
+        chat_response_cache[cache_key] = (reply, time.monotonic() + CHAT_RESPONSE_CACHE_TTL)
+
+def record_cached_turn(session_id: str, message: str, reply: str):
+    """Prime the session's chat with a turn answered from the response cache.
+
+    The model never saw that turn, so the cached LlmChat is replaced by one
+    whose history holds it; the next message then has the right context
+    without waiting for the turn to reach MongoDB.
+    """
+    if CHAT_SESSION_STORE != 'memory':
+        return
+    history = [{"role": "user", "content": message}, {"role": "assistant", "content": reply}]
+    chat_sessions[session_id] = ChatContext(
+        new_session_chat(session_id, history), turns=1, tokens=history_tokens(None, history), history=history
+    )
+
+SUMMARIZER_SYSTEM_MESSAGE = "You maintain a running summary of a conversation between a user and the BdAsk assistant. Write in the conversation's language. Keep names, facts, decisions, user preferences and open questions; drop pleasantries. Respond with only the summary, at most 250 words."
+
+async def compact_chat_context(session_id: str):
+    """Fold turns older than the recent window into the session's summary.
+
+    The cached LlmChat is dropped afterwards so the next turn rebuilds it
+    from the summary and recent turns.
+    """
+    compacting_sessions.add(session_id)
+    try:
+        session = await db.chat_sessions.find_one(
+            {"id": session_id},
+            {"_id": 0, "context_summary": 1, "summarized_until": 1, "archived_at": 1}
+        ) or {}
+        query = {"session_id": session_id}
+        if session.get("summarized_until"):
+            query["timestamp"] = {"$gt": session["summarized_until"]}
+        messages = await db.chat_messages.find(
+            query,
+            {"_id": 0, "id": 1, "role": 1, "content": 1, "timestamp": 1}
+        ).sort("timestamp", 1).to_list(None)
+        if session.get("archived_at"):
+            archived = await archived_messages(session_id, since=session.get("summarized_until"))
+            messages = merge_messages(archived, messages)
+        
+        older = messages[:-CHAT_CONTEXT_RECENT_TURNS * 2]
+        if not older:
+            return
         
-        chat = LlmChat(
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in older)
+        previous = session.get("context_summary") or "(none)"
+        prompt = f"Current summary:\n{previous}\n\nNew conversation turns to fold in:\n{transcript}"
+        
+        api_key = os.environ.get('EMERGENT_LLM_KEY')
+        summarizer = LlmChat(
             api_key=api_key,
-            session_id=session_id,
-            system_message=get_system_message()  # Use dynamic system message
+            session_id=f"summary_{session_id}_{uuid.uuid4()}",
+            system_message=SUMMARIZER_SYSTEM_MESSAGE
         ).with_model("gemini", "gemini-3-flash-preview")
+        summary = (await call_llm(summarizer, UserMessage(text=prompt), "summarize")).strip()
         
-        chat_sessions[session_id] = chat
-        logger.info(f"Created new chat session: {session_id}")
+        # Only apply if no other worker compacted this session meanwhile
+        result = await db.chat_sessions.update_one(
+            {"id": session_id, "summarized_until": session.get("summarized_until")},
+            {"$set": {"context_summary": summary, "summarized_until": older[-1]["timestamp"]}}
+        )
+        chat_sessions.pop(session_id)
+        if result.modified_count:
+            logger.info(f"Compacted {len(older)} messages of session {session_id} into its summary")
+    except Exception as e:
+        logger.warning(f"Context compaction failed for {session_id}: {str(e)}")
+    finally:
+        compacting_sessions.discard(session_id)
+
+def spawn_background(coro) -> asyncio.Task:
+    """Run a coroutine detached from the request that started it"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def persist_chat_messages(*messages: ChatMessage, touch_session: Optional[str] = None):
+    """Store chat messages (with their search terms) and optionally bump the session's updated_at.
+
+    With CHAT_WRITE_BEHIND enabled the writes are buffered and flushed in
+    bulk (see ChatWriteBehind for delivery guarantees); otherwise the
+    message insert and session update run concurrently.
+    """
+    docs = [{**msg.model_dump(), "search_terms": index_terms(msg.content)} for msg in messages]
+    if chat_writer is not None:
+        for doc in docs:
+            chat_writer.add_message(doc)
+        if touch_session:
+            chat_writer.touch_session(touch_session, datetime.now(timezone.utc))
+        return
     
-    return chat_sessions[session_id]
+    writes = []
+    if len(docs) == 1:
+        writes.append(db.chat_messages.insert_one(docs[0]))
+    elif docs:
+        writes.append(db.chat_messages.insert_many(docs))
+    if touch_session:
+        writes.append(db.chat_sessions.update_one(
+            {"id": touch_session},
+            {"$set": {"updated_at": datetime.now(timezone.utc)}}
+        ))
+    await asyncio.gather(*writes)
+
+async def call_llm(chat: LlmChat, user_message: UserMessage, operation: str) -> str:
+    """Send one message to the model under admission control, recording latency and reply size"""
+    llm_breaker.check()
+    async with llm_limiter.slot(), llm_breaker.guard():
+        with LLM_LATENCY.labels(operation).time():
+            try:
+                reply = await chat.send_message(user_message)
+            except Exception:
+                LLM_ERRORS.labels(operation).inc()
+                raise
+    LLM_RESPONSE_CHARS.labels(operation).observe(len(reply))
+    return reply
+
+async def iter_llm_reply(context: ChatContext, message: str):
+    """Yield the model's reply to `message` as the provider streams it.
+
+    Streams through litellm with LLM_STREAM_API_KEY, under the same admission
+    control, breaker and metrics as call_llm. Without a provider key the
+    Emergent client is used, which can't stream: the whole reply is yielded
+    as one chunk once complete, no sooner than /chat/send would return it.
+    """
+    if not LLM_STREAM_API_KEY:
+        yield await call_llm(context.chat, UserMessage(text=message), "chat_stream")
+        return
+    
+    messages = [
+        {"role": "system", "content": session_system_message(context.summary)},
+        *context.history,
+        {"role": "user", "content": message}
+    ]
+    size = 0
+    llm_breaker.check()
+    async with llm_limiter.slot(), llm_breaker.guard():
+        with LLM_LATENCY.labels("chat_stream").time():
+            try:
+                response = await acompletion(
+                    model=LLM_STREAM_MODEL,
+                    messages=messages,
+                    api_key=LLM_STREAM_API_KEY,
+                    api_base=LLM_STREAM_API_BASE,
+                    stream=True
+                )
+                async for chunk in response:
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if text:
+                        size += len(text)
+                        yield text
+            except Exception:
+                LLM_ERRORS.labels("chat_stream").inc()
+                raise
+    LLM_RESPONSE_CHARS.labels("chat_stream").observe(size)
+
+def reply_message(user_msg: ChatMessage, content: str) -> ChatMessage:
+    """The assistant message answering user_msg.
+
+    Timestamped at least 1 ms after it, so the pair keeps its order at BSON's
+    millisecond precision even when the reply comes straight from a cache.
+    """
+    return ChatMessage(
+        session_id=user_msg.session_id,
+        role="assistant",
+        content=content,
+        timestamp=max(datetime.now(timezone.utc), user_msg.timestamp + timedelta(milliseconds=1))
+    )
+
+async def iter_cached_reply(text: str):
+    """A cached reply is already complete, so it goes out as a single chunk"""
+    yield text
+
+async def run_chat_turn(context: ChatContext, user_msg: ChatMessage, queue: asyncio.Queue):
+    """Generate and persist one assistant reply, publishing progress to queue.
+
+    Runs as a background task so the reply is still saved when the client
+    that asked for it goes away mid-stream. The user message is written
+    while the model is generating. Releases the session's turn lock, which
+    the caller must hold.
+    """
+    session_id = user_msg.session_id
+    parts = []
+    user_write = asyncio.ensure_future(persist_chat_messages(user_msg))
+    try:
+        cache_key = first_turn_cache_key(context, user_msg.content)
+        cached = lookup_cached_reply(cache_key)
+        if cached is not None:
+            chunks = iter_cached_reply(cached)
+        else:
+            chunks = iter_llm_reply(context, user_msg.content)
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                queue.put_nowait(("token", {"text": chunk}))
+        finally:
+            await user_write
+
+        ai_msg = reply_message(user_msg, "".join(parts))
+        await persist_chat_messages(ai_msg, touch_session=session_id)
+        if cached is not None:
+            record_cached_turn(session_id, user_msg.content, cached)
+        else:
+            store_cached_reply(cache_key, ai_msg.content)
+            record_chat_turn(session_id, context, user_msg.content, ai_msg.content)
+            if LLM_STREAM_API_KEY:
+                # The LlmChat that /chat/send uses never saw a streamed turn
+                context.chat = new_session_chat(session_id, context.history, context.summary)
+        logger.info(f"Chat stream completed for session: {session_id}")
+        queue.put_nowait(("done", {
+            "session_id": session_id,
+            "message_id": ai_msg.id,
+            "timestamp": ai_msg.timestamp.isoformat()
+        }))
+    except AdmissionRejected as e:
+        queue.put_nowait(("error", {"detail": e.detail, "retry_after": e.retry_after}))
+    except Exception as e:
+        logger.error(f"Error in chat stream: {str(e)}")
+        queue.put_nowait(("error", {"detail": f"চ্যাটে সমস্যা হয়েছে: {str(e)}"}))
+    finally:
+        await session_turns.release(session_id)
+
+def format_sse(event: str, data: dict) -> str:
+    """Encode one Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def encode_cursor(moment: datetime, item_id: str) -> str:
+    """Opaque keyset cursor for a (datetime, id) position"""
+    raw = json.dumps([moment.isoformat(), item_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        moment, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        moment = datetime.fromisoformat(moment)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment, str(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def keyset_page(collection, query: dict, field: str, limit: int,
+                      before: Optional[str] = None, after: Optional[str] = None,
+                      projection: Optional[dict] = None) -> tuple:
+    """Fetch one page ordered by (field, id) ascending.
+
+    `after` walks forward from a cursor; otherwise the page ends just before
+    the `before` cursor (or at the newest item). Returns (items, has_more)
+    where has_more refers to the direction of travel.
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    
+    cursor = after or before
+    if cursor:
+        moment, item_id = decode_cursor(cursor)
+        op = "$gt" if after else "$lt"
+        query = {"$and": [query, {"$or": [
+            {field: {op: moment}},
+            {field: moment, "id": {op: item_id}}
+        ]}]}
+    
+    direction = 1 if after else -1
+    items = await collection.find(query, projection or {"_id": 0}).sort(
+        [(field, direction), ("id", direction)]
+    ).limit(limit + 1).to_list(limit + 1)
+    
+    has_more = len(items) > limit
+    items = items[:limit]
+    if not after:
+        items.reverse()
+    return items, has_more
+
+def set_page_headers(response: Response, items: List[dict], field: str, has_more: bool):
+    """Expose the cursors of a page's oldest and newest items"""
+    if items:
+        oldest, newest = items[0], items[-1]
+        response.headers["X-Before-Cursor"] = encode_cursor(oldest[field], oldest["id"])
+        response.headers["X-After-Cursor"] = encode_cursor(newest[field], newest["id"])
+    response.headers["X-Has-More"] = "true" if has_more else "false"
 
 # Routes
 @api_router.get("/")
@@ -142,91 +855,170 @@ async def root():
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.model_dump()
     status_obj = StatusCheck(**status_dict)
-    doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
-    _ = await db.status_checks.insert_one(doc)
+    _ = await db.status_checks.insert_one(status_obj.model_dump())
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks():
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
-    return status_checks
+    return await db.status_checks.find({}, {"_id": 0}).to_list(1000)
 
 # Chat endpoints
 @api_router.post("/chat/session", response_model=ChatSession)
 async def create_chat_session(request: NewSessionRequest):
     """Create a new chat session"""
     session = ChatSession(title=request.title or "নতুন কথোপকথন")
-    doc = session.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['updated_at'] = doc['updated_at'].isoformat()
-    await db.chat_sessions.insert_one(doc)
+    await db.chat_sessions.insert_one(session.model_dump())
     logger.info(f"Created chat session: {session.id}")
     return session
 
 @api_router.get("/chat/sessions", response_model=List[ChatSession])
-async def get_chat_sessions():
-    """Get all chat sessions"""
-    sessions = await db.chat_sessions.find({}, {"_id": 0}).sort("updated_at", -1).to_list(100)
-    for session in sessions:
-        if isinstance(session.get('created_at'), str):
-            session['created_at'] = datetime.fromisoformat(session['created_at'])
-        if isinstance(session.get('updated_at'), str):
-            session['updated_at'] = datetime.fromisoformat(session['updated_at'])
+async def get_chat_sessions(
+    response: Response,
+    limit: int = Query(100, ge=1, le=100),
+    before: Optional[str] = None,
+    after: Optional[str] = None
+):
+    """Get chat sessions, most recently updated first.
+
+    Pass X-Before-Cursor as `before` to load older sessions, or
+    X-After-Cursor as `after` to load ones updated since.
+    """
+    sessions, has_more = await keyset_page(db.chat_sessions, {}, "updated_at", limit, before, after)
+    set_page_headers(response, sessions, "updated_at", has_more)
+    sessions.reverse()
     return sessions
 
 @api_router.get("/chat/messages/{session_id}", response_model=List[ChatMessage])
-async def get_chat_messages(session_id: str):
-    """Get all messages for a session"""
-    messages = await db.chat_messages.find(
-        {"session_id": session_id}, 
-        {"_id": 0}
-    ).sort("timestamp", 1).to_list(1000)
-    
-    for msg in messages:
-        if isinstance(msg.get('timestamp'), str):
-            msg['timestamp'] = datetime.fromisoformat(msg['timestamp'])
+async def get_chat_messages(
+    session_id: str,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=1000),
+    before: Optional[str] = None,
+    after: Optional[str] = None
+):
+    """Get messages for a session in chronological order.
+
+    Without a cursor this returns the most recent `limit` messages. Pass
+    X-Before-Cursor as `before` to load older ones on scroll, or
+    X-After-Cursor as `after` to fetch newer ones.
+    """
+    (messages, has_more), archived = await asyncio.gather(
+        keyset_page(
+            db.chat_messages, {"session_id": session_id}, "timestamp", limit, before, after,
+            projection={"_id": 0, "search_terms": 0}
+        ),
+        archived_messages(session_id)
+    )
+    if archived:
+        # Older sessions are (partly) archived; page over both tiers as one history
+        cursor = decode_cursor(after or before) if (after or before) else None
+        messages, has_more = merge_page(archived, messages, has_more, limit, cursor, forward=bool(after))
+    set_page_headers(response, messages, "timestamp", has_more)
     return messages
 
+@api_router.get("/chat/search", response_model=List[ChatSearchResult])
+async def search_chat_messages(
+    q: str = Query(..., min_length=1, max_length=200),
+    session_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=50)
+):
+    """Search past messages, best matches first.
+
+    Bengali and Banglish spellings of a word find each other (see search.py);
+    messages matching more query words rank higher, then newer ones.
+    """
+    terms = query_terms(q)
+    if not terms:
+        return []
+    
+    match = {"search_terms": {"$in": terms}}
+    if session_id:
+        match["session_id"] = session_id
+    hits = await db.chat_messages.aggregate([
+        {"$match": match},
+        {"$sort": {"timestamp": -1}},
+        {"$limit": CHAT_SEARCH_CANDIDATES},
+        {"$project": {
+            "_id": 0, "id": 1, "session_id": 1, "role": 1, "content": 1, "timestamp": 1,
+            # search_terms holds distinct terms, so this counts matched terms
+            "score": {"$size": {"$filter": {"input": "$search_terms", "cond": {"$in": ["$$this", terms]}}}}
+        }},
+        {"$sort": {"score": -1, "timestamp": -1}},
+        {"$limit": limit}
+    ]).to_list(limit)
+    
+    # Archived sessions are matched on their combined terms, then scored per message
+    wanted = set(terms)
+    seen = {hit["id"] for hit in hits}
+    archives = await db.chat_archives.find(
+        match, {"_id": 0, "codec": 1, "data": 1}
+    ).sort("last_timestamp", -1).to_list(CHAT_ARCHIVE_SEARCH_LIMIT)
+    for archive in archives:
+        for message in unpack_messages(archive):
+            score = len(wanted.intersection(index_terms(message["content"])))
+            if score and message["id"] not in seen:
+                hits.append({**message, "score": score})
+    if archives:
+        hits.sort(key=lambda hit: (hit["score"], hit["timestamp"]), reverse=True)
+        hits = hits[:limit]
+    
+    session_ids = list({hit["session_id"] for hit in hits})
+    titles = {
+        s["id"]: s.get("title")
+        async for s in db.chat_sessions.find({"id": {"$in": session_ids}}, {"_id": 0, "id": 1, "title": 1})
+    }
+    
+    results = []
+    for hit in hits:
+        text, highlights = snippet(hit["content"], wanted)
+        results.append(ChatSearchResult(
+            session_id=hit["session_id"],
+            session_title=titles.get(hit["session_id"]),
+            message_id=hit["id"],
+            role=hit["role"],
+            timestamp=hit["timestamp"],
+            snippet=text,
+            highlights=highlights,
+            score=hit["score"]
+        ))
+    return results
+
 @api_router.post("/chat/send", response_model=ChatResponse)
 async def send_chat_message(request: ChatRequest):
     """Send a message and get AI response"""
     try:
-        # Save user message
-        user_msg = ChatMessage(
-            session_id=request.session_id,
-            role="user",
-            content=request.message
-        )
-        user_doc = user_msg.model_dump()
-        user_doc['timestamp'] = user_doc['timestamp'].isoformat()
-        await db.chat_messages.insert_one(user_doc)
-        
-        # Get or create chat session
-        chat = get_or_create_chat(request.session_id)
-        
-        # Send message to AI
-        user_message = UserMessage(text=request.message)
-        response = await chat.send_message(user_message)
-        
-        # Save AI response
-        ai_msg = ChatMessage(
-            session_id=request.session_id,
-            role="assistant",
-            content=response
-        )
-        ai_doc = ai_msg.model_dump()
-        ai_doc['timestamp'] = ai_doc['timestamp'].isoformat()
-        await db.chat_messages.insert_one(ai_doc)
-        
-        # Update session timestamp
-        await db.chat_sessions.update_one(
-            {"id": request.session_id},
-            {"$set": {"updated_at": datetime.now(timezone.utc).isoformat()}}
-        )
+        llm_breaker.check()
+        llm_limiter.check()
+        async with session_turns.turn(request.session_id):
+            # Get or create chat session (before saving, so the turn isn't replayed)
+            context = await get_chat_context(request.session_id)
+            
+            # Save user message while the AI is generating
+            user_msg = ChatMessage(session_id=request.session_id, role="user", content=request.message)
+            user_write = asyncio.ensure_future(persist_chat_messages(user_msg))
+            
+            # Opening messages may be answered from the response cache
+            cache_key = first_turn_cache_key(context, request.message)
+            cached = lookup_cached_reply(cache_key)
+            
+            # Send message to AI
+            try:
+                if cached is not None:
+                    response = cached
+                else:
+                    user_message = UserMessage(text=request.message)
+                    response = await call_llm(context.chat, user_message, "chat")
+            finally:
+                await user_write
+            
+            # Save AI response and update session timestamp
+            ai_msg = reply_message(user_msg, response)
+            await persist_chat_messages(ai_msg, touch_session=request.session_id)
+            if cached is not None:
+                record_cached_turn(request.session_id, request.message, response)
+            else:
+                store_cached_reply(cache_key, response)
+                record_chat_turn(request.session_id, context, request.message, response)
         
         logger.info(f"Chat response sent for session: {request.session_id}")
         
@@ -236,114 +1028,394 @@ async def send_chat_message(request: ChatRequest):
             timestamp=datetime.now(timezone.utc)
         )
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logger.error(f"Error in chat: {str(e)}")
         raise HTTPException(status_code=500, detail=f"চ্যাটে সমস্যা হয়েছে: {str(e)}")
 
+@api_router.post("/chat/stream")
+async def stream_chat_message(request: ChatRequest, http_request: Request):
+    """Send a message and stream the AI response as Server-Sent Events.
+
+    Emits a `start` event immediately, a `token` event per chunk the provider
+    streams (a single one when it can't, see iter_llm_reply) and a final
+    `done` (or `error`) event. The complete reply is stored in chat_messages even if
+    the client disconnects before the stream ends.
+    """
+    # Turn away overload before committing to a 200 stream; the session
+    # lock is held until run_chat_turn finishes
+    llm_breaker.check()
+    llm_limiter.check()
+    await session_turns.acquire(request.session_id)
+    try:
+        context = await get_chat_context(request.session_id)
+    except Exception as e:
+        await session_turns.release(request.session_id)
+        logger.error(f"Error in chat stream: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"চ্যাটে সমস্যা হয়েছে: {str(e)}")
+    user_msg = ChatMessage(session_id=request.session_id, role="user", content=request.message)
+    queue = asyncio.Queue()
+    spawn_background(run_chat_turn(context, user_msg, queue))
+
+    async def event_stream():
+        yield format_sse("start", {"session_id": request.session_id})
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await http_request.is_disconnected():
+                    logger.info(f"Client left chat stream: {request.session_id}")
+                    return
+                # Comment frame keeps mobile proxies from closing an idle stream
+                yield ": ping\n\n"
+                continue
+            yield format_sse(event, data)
+            if event in ("done", "error"):
+                return
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def purge_session(session_id: str):
+    """Remove a session with its live and archived messages"""
+    await db.chat_sessions.delete_one({"id": session_id})
+    await db.chat_messages.delete_many({"session_id": session_id})
+    await db.chat_archives.delete_one({"session_id": session_id})
+    chat_sessions.pop(session_id)
+
 @api_router.delete("/chat/session/{session_id}")
 async def delete_chat_session(session_id: str):
     """Delete a chat session and its messages"""
-    await db.chat_sessions.delete_one({"id": session_id})
-    await db.chat_messages.delete_many({"session_id": session_id})
-    
-    if session_id in chat_sessions:
-        del chat_sessions[session_id]
+    if chat_writer is not None:
+        # Don't let buffered writes resurrect messages after the delete
+        await chat_writer.flush()
+    await purge_session(session_id)
     
     logger.info(f"Deleted chat session: {session_id}")
     return {"message": "সেশন মুছে ফেলা হয়েছে"}
 
+# Language names for prompt
+LANG_NAMES = {
+    'bn': 'Bengali', 'en': 'English', 'hi': 'Hindi', 'ur': 'Urdu',
+    'ar': 'Arabic', 'es': 'Spanish', 'fr': 'French', 'de': 'German',
+    'zh': 'Chinese', 'ja': 'Japanese', 'ko': 'Korean'
+}
+
+TRANSLATOR_SYSTEM_MESSAGE = "You are a professional translator. Translate the given text accurately while preserving meaning, tone, and cultural nuances. Only respond with the translated text, nothing else."
+TRANSLATOR_MODEL = "gemini-3-flash-preview"
+# Bump when the translation prompts in llm_translate/llm_translate_batch change
+TRANSLATOR_PROMPT_REVISION = "1"
+# Part of every translation cache key, so a new model or prompt doesn't keep
+# serving translations made with the old one
+TRANSLATOR_PROMPT_VERSION = hashlib.sha256(
+    f"{TRANSLATOR_PROMPT_REVISION}\n{TRANSLATOR_MODEL}\n{TRANSLATOR_SYSTEM_MESSAGE}".encode("utf-8")
+).hexdigest()[:12]
+
+def new_translator_chat() -> LlmChat:
+    """Create a throwaway Gemini chat for a translation request"""
+    api_key = os.environ.get('EMERGENT_LLM_KEY')
+    if not api_key:
+        raise ValueError("EMERGENT_LLM_KEY not found")
+    
+    return LlmChat(
+        api_key=api_key,
+        session_id=f"translate_{uuid.uuid4()}",
+        system_message=TRANSLATOR_SYSTEM_MESSAGE
+    ).with_model("gemini", TRANSLATOR_MODEL)
+
+async def llm_translate(text: str, source: str, target: str) -> str:
+    """Translate text with one Gemini round trip"""
+    chat = new_translator_chat()
+    
+    source_name = LANG_NAMES.get(source, source)
+    target_name = LANG_NAMES.get(target, target)
+    
+    prompt = f"Translate the following text from {source_name} to {target_name}:\n\n{text}"
+    
+    translated = await call_llm(chat, UserMessage(text=prompt), "translate")
+    return translated.strip()
+
+def normalize_translation_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC with the ends trimmed.
+
+    Inner whitespace is kept: line breaks and blank lines shape the
+    translation, so "A\\n\\nB" and "A B" must not share an entry.
+    """
+    return unicodedata.normalize("NFC", text).strip()
+
+def translation_cache_key(text: str, source: str, target: str) -> str:
+    digest = hashlib.sha256(normalize_translation_text(text).encode("utf-8")).hexdigest()
+    return f"{TRANSLATOR_PROMPT_VERSION}:{source}:{target}:{digest}"
+
+def translation_fields(source: str, target: str, translated: str) -> dict:
+    return {
+        "source": source,
+        "target": target,
+        "translated_text": translated,
+        "created_at": datetime.now(timezone.utc)
+    }
+
+async def store_translation(key: str, source: str, target: str, translated: str):
+    """Write a translation to both cache tiers"""
+    translation_cache[key] = translated
+    await db.translations.update_one(
+        {"_id": key},
+        {"$set": translation_fields(source, target, translated)},
+        upsert=True
+    )
+
+async def store_translations(translations: dict, source: str, target: str):
+    """Write many translations (key -> text) to both cache tiers in one round trip"""
+    for key, translated in translations.items():
+        translation_cache[key] = translated
+    if translations:
+        await db.translations.bulk_write([
+            UpdateOne({"_id": key}, {"$set": translation_fields(source, target, translated)}, upsert=True)
+            for key, translated in translations.items()
+        ], ordered=False)
+
+async def lookup_translations(keys: List[str]) -> dict:
+    """Resolve as many keys as possible from the cache tiers; returns key -> text"""
+    found = {}
+    missing = []
+    for key in keys:
+        translated = translation_cache.get(key)
+        if translated is not None:
+            translation_cache_stats["memory_hits"] += 1
+            found[key] = translated
+        else:
+            missing.append(key)
+    
+    if missing:
+        async for doc in db.translations.find({"_id": {"$in": missing}}, {"translated_text": 1}):
+            translation_cache_stats["db_hits"] += 1
+            translation_cache[doc["_id"]] = doc["translated_text"]
+            found[doc["_id"]] = doc["translated_text"]
+    
+    translation_cache_stats["misses"] += len(set(keys) - found.keys())
+    return found
+
+async def cached_translate(text: str, source: str, target: str) -> str:
+    """Translate through the in-process LRU, then MongoDB, then the LLM"""
+    key = translation_cache_key(text, source, target)
+    found = await lookup_translations([key])
+    if key in found:
+        return found[key]
+    
+    translated = await llm_translate(text, source, target)
+    await store_translation(key, source, target, translated)
+    return translated
+
+# Batches are capped by total characters so prompt and reply stay well inside
+# the model's output limit
+TRANSLATION_BATCH_CHAR_BUDGET = int(os.environ.get('TRANSLATION_BATCH_CHAR_BUDGET', '4000'))
+TRANSLATION_BATCH_MAX_SEGMENTS = int(os.environ.get('TRANSLATION_BATCH_MAX_SEGMENTS', '40'))
+# One-call-per-segment retries of failed batches, across all requests, so a
+# large batch can't flood the LLM queue and be turned away
+TRANSLATION_FALLBACK_CONCURRENCY = int(os.environ.get('TRANSLATION_FALLBACK_CONCURRENCY', '4'))
+translation_fallback_slots = asyncio.Semaphore(TRANSLATION_FALLBACK_CONCURRENCY)
+
+def pack_translation_batches(segments: List[str]) -> List[List[str]]:
+    """Greedily group segments into batches that fit the size budget"""
+    batches = []
+    current = []
+    size = 0
+    for segment in segments:
+        if current and (size + len(segment) > TRANSLATION_BATCH_CHAR_BUDGET
+                        or len(current) >= TRANSLATION_BATCH_MAX_SEGMENTS):
+            batches.append(current)
+            current = []
+            size = 0
+        current.append(segment)
+        size += len(segment)
+    if current:
+        batches.append(current)
+    return batches
+
+def parse_batch_translation(reply: str, expected: int) -> Optional[List[str]]:
+    """Parse the model's JSON array reply; None if it doesn't line up"""
+    text = reply.strip()
+    # Models sometimes wrap JSON in a markdown code fence
+    fence = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, re.DOTALL)
+    if fence:
+        text = fence.group(1)
+    try:
+        items = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(items, list) or len(items) != expected:
+        return None
+    if not all(isinstance(item, str) for item in items):
+        return None
+    return [item.strip() for item in items]
+
+async def llm_translate_batch(segments: List[str], source: str, target: str) -> List[str]:
+    """Translate several segments in one LLM call, falling back to one call each"""
+    if len(segments) == 1:
+        return [await llm_translate(segments[0], source, target)]
+    
+    source_name = LANG_NAMES.get(source, source)
+    target_name = LANG_NAMES.get(target, target)
+    prompt = (
+        f"Translate each string in the following JSON array from {source_name} to {target_name}. "
+        f"Respond with only a JSON array of exactly {len(segments)} translated strings, "
+        f"in the same order, with no other text.\n\n"
+        f"{json.dumps(segments, ensure_ascii=False)}"
+    )
+    
+    try:
+        reply = await call_llm(new_translator_chat(), UserMessage(text=prompt), "translate_batch")
+        translations = parse_batch_translation(reply, len(segments))
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        logger.warning(f"Batch translation call failed: {str(e)}")
+        translations = None
+    
+    if translations is None:
+        logger.warning(f"Unparseable batch translation reply, retrying {len(segments)} segments individually")
+        translations = await asyncio.gather(*[fallback_translate(seg, source, target) for seg in segments])
+    return list(translations)
+
+async def fallback_translate(text: str, source: str, target: str) -> str:
+    async with translation_fallback_slots:
+        return await llm_translate(text, source, target)
+
 @api_router.post("/translate", response_model=TranslationResponse)
 async def translate_text(request: TranslationRequest):
-    """Translate text using Gemini LLM"""
+    """Translate text using Gemini LLM (cached)"""
     try:
-        api_key = os.environ.get('EMERGENT_LLM_KEY')
-        if not api_key:
-            raise ValueError("EMERGENT_LLM_KEY not found")
+        translated = await cached_translate(request.text, request.source, request.target)
         
-        # Use Gemini for translation
-        chat = LlmChat(
-            api_key=api_key,
-            session_id=f"translate_{uuid.uuid4()}",
-            system_message="You are a professional translator. Translate the given text accurately while preserving meaning, tone, and cultural nuances. Only respond with the translated text, nothing else."
-        ).with_model("gemini", "gemini-3-flash-preview")
-        
-        # Language names for prompt
-        lang_names = {
-            'bn': 'Bengali', 'en': 'English', 'hi': 'Hindi', 'ur': 'Urdu',
-            'ar': 'Arabic', 'es': 'Spanish', 'fr': 'French', 'de': 'German',
-            'zh': 'Chinese', 'ja': 'Japanese', 'ko': 'Korean'
-        }
+        logger.info(f"Translation completed: {request.source} -> {request.target}")
         
-        source_name = lang_names.get(request.source, request.source)
-        target_name = lang_names.get(request.target, request.target)
+        return TranslationResponse(
+            translated_text=translated,
+            source=request.source,
+            target=request.target
+        )
         
-        prompt = f"Translate the following text from {source_name} to {target_name}:\n\n{request.text}"
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        logger.error(f"Translation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"অনুবাদে সমস্যা হয়েছে: {str(e)}")
+
+@api_router.post("/translate/batch", response_model=BatchTranslationResponse)
+async def translate_batch(request: BatchTranslationRequest):
+    """Translate many segments for one language pair with as few LLM calls as possible"""
+    try:
+        keys = [translation_cache_key(seg, request.source, request.target) for seg in request.segments]
+        results = await lookup_translations(list(dict.fromkeys(keys)))
         
-        user_message = UserMessage(text=prompt)
-        translated = await chat.send_message(user_message)
+        # Translate each distinct uncached segment once
+        pending = {}
+        for key, segment in zip(keys, request.segments):
+            if key not in results and key not in pending:
+                pending[key] = segment
         
-        logger.info(f"Translation completed: {request.source} -> {request.target}")
+        if pending:
+            pending_keys = list(pending)
+            batches = pack_translation_batches(list(pending.values()))
+            translated = await asyncio.gather(*[
+                llm_translate_batch(batch, request.source, request.target) for batch in batches
+            ])
+            flat = [text for batch in translated for text in batch]
+            fresh = dict(zip(pending_keys, flat))
+            results.update(fresh)
+            await store_translations(fresh, request.source, request.target)
+            logger.info(f"Batch translation: {len(pending)} segments in {len(batches)} LLM calls")
         
-        return TranslationResponse(
-            translated_text=translated.strip(),
+        return BatchTranslationResponse(
+            translations=[
+                TranslationResponse(translated_text=results[key], source=request.source, target=request.target)
+                for key in keys
+            ],
             source=request.source,
             target=request.target
         )
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
-        logger.error(f"Translation error: {str(e)}")
+        logger.error(f"Batch translation error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"অনুবাদে সমস্যা হয়েছে: {str(e)}")
 
+@api_router.get("/translate/cache/stats")
+async def get_translation_cache_stats():
+    """Translation cache hit/miss counters for this worker"""
+    lookups = sum(translation_cache_stats.values())
+    hits = translation_cache_stats["memory_hits"] + translation_cache_stats["db_hits"]
+    return {
+        **translation_cache_stats,
+        "memory_entries": len(translation_cache),
+        "hit_ratio": hits / lookups if lookups else 0.0
+    }
+
 # Cricket API endpoint
 @api_router.get("/cricket/live")
-async def get_live_cricket():
+async def get_live_cricket(request: Request):
+    """Get live cricket scores (cached)"""
+    payload = await cricket_cache.get("current", fetch_live_cricket)
+    return feed_responses["cricket"].respond(request, "current", payload)
+
+@upstream_quotas.guard("cricapi")
+@upstream_breakers["cricapi"].protect
+async def fetch_live_cricket():
     """Get live cricket scores from CricketData.org"""
-    import httpx
-    
     cricket_api_key = os.environ.get('CRICKET_API_KEY')
     if not cricket_api_key:
         raise HTTPException(status_code=500, detail="Cricket API key not configured")
     
     try:
-        async with httpx.AsyncClient() as client:
-            # Get current matches
-            response = await client.get(
-                f"https://api.cricapi.com/v1/currentMatches?apikey={cricket_api_key}&offset=0",
-                timeout=10.0
-            )
-            data = response.json()
-            
-            if data.get('status') != 'success':
-                logger.warning(f"Cricket API returned: {data}")
-                return {"matches": [], "message": "No live matches found"}
-            
-            matches = []
-            for match in data.get('data', [])[:10]:  # Limit to 10 matches
-                # Check if match has required fields
-                if not match.get('name'):
-                    continue
-                    
-                match_info = {
-                    "id": match.get('id', ''),
-                    "name": match.get('name', ''),
-                    "status": match.get('status', 'Unknown'),
-                    "venue": match.get('venue', ''),
-                    "date": match.get('date', ''),
-                    "matchType": match.get('matchType', ''),
-                    "teams": match.get('teams', []),
-                    "score": match.get('score', []),
-                    "series_id": match.get('series_id', ''),
-                    "fantasyEnabled": match.get('fantasyEnabled', False),
-                    "bbbEnabled": match.get('bbbEnabled', False),
-                    "hasSquad": match.get('hasSquad', False),
-                    "matchStarted": match.get('matchStarted', False),
-                    "matchEnded": match.get('matchEnded', False)
-                }
-                matches.append(match_info)
-            
-            logger.info(f"Cricket API returned {len(matches)} matches")
-            return {"matches": matches, "total": len(matches)}
-            
+        client = get_http_client()
+        # Get current matches
+        response = await client.get(
+            f"https://api.cricapi.com/v1/currentMatches?apikey={cricket_api_key}&offset=0",
+            timeout=10.0
+        )
+        if response.is_error:
+            raise HTTPException(status_code=502, detail=f"Cricket API returned {response.status_code}")
+        data = response.json()
+        
+        # An error reply must fail the fetch so the last good scores stay cached
+        if data.get('status') != 'success':
+            logger.warning(f"Cricket API returned: {data}")
+            raise HTTPException(status_code=502, detail=f"Cricket API error: {data.get('reason') or data.get('status')}")
+        
+        matches = []
+        for match in data.get('data', [])[:10]:  # Limit to 10 matches
+            # Check if match has required fields
+            if not match.get('name'):
+                continue
+                
+            match_info = {
+                "id": match.get('id', ''),
+                "name": match.get('name', ''),
+                "status": match.get('status', 'Unknown'),
+                "venue": match.get('venue', ''),
+                "date": match.get('date', ''),
+                "matchType": match.get('matchType', ''),
+                "teams": match.get('teams', []),
+                "score": match.get('score', []),
+                "series_id": match.get('series_id', ''),
+                "fantasyEnabled": match.get('fantasyEnabled', False),
+                "bbbEnabled": match.get('bbbEnabled', False),
+                "hasSquad": match.get('hasSquad', False),
+                "matchStarted": match.get('matchStarted', False),
+                "matchEnded": match.get('matchEnded', False)
+            }
+            matches.append(match_info)
+        
+        logger.info(f"Cricket API returned {len(matches)} matches")
+        return {"matches": matches, "total": len(matches)}
+        
+    except HTTPException:
+        raise
     except httpx.TimeoutException:
         logger.error("Cricket API timeout")
         raise HTTPException(status_code=504, detail="Cricket API timeout")
@@ -353,60 +1425,173 @@ async def get_live_cricket():
 
 # News API endpoint
 @api_router.get("/news")
-async def get_news(category: str = None):
-    """Get Bangladesh news from NewsData.io"""
-    import httpx
+async def get_news(
+    request: Request,
+    category: str = None,
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    since: Optional[str] = None,
+    before: Optional[str] = None
+):
+    """Get Bangladesh news, newest first.
+
+    Articles are served from our own store, which is topped up from
+    NewsData.io at most once per cache TTL. Pass `sinceCursor` from a previous
+    response as `since` to get only newer articles, or `beforeCursor` as
+    `before` to page back through older ones.
+    """
+    key = (category or 'all').lower()
+    latest = await news_cache.get(key, lambda: refresh_news(category))
+    if since is None and before is None and limit in (None, NEWS_PAGE_SIZE):
+        return feed_responses["news"].respond(request, key, latest)
+    
+    payload = await news_page(category, limit or NEWS_PAGE_SIZE, before=before, since=since)
+    return feed_responses["news"].respond(request, (key, limit, since, before), payload)
+
+NEWS_PAGE_SIZE = int(os.environ.get('NEWS_PAGE_SIZE', '15'))
+
+# Our category names -> NewsData.io categories
+NEWS_CATEGORY_MAP = {
+    'national': 'politics',
+    'international': 'world',
+    'economy': 'business',
+    'sports': 'sports',
+    'technology': 'technology',
+    'entertainment': 'entertainment'
+}
+
+def news_upstream_category(category: Optional[str]) -> Optional[str]:
+    if not category or category.lower() == 'all':
+        return None
+    return NEWS_CATEGORY_MAP.get(category.lower(), category)
+
+def parse_pub_date(value: str) -> Optional[datetime]:
+    """Parse NewsData.io's pubDate ("YYYY-MM-DD HH:MM:SS", UTC)"""
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+def news_article_view(doc: dict) -> dict:
+    """API shape of a stored article"""
+    return {
+        "id": doc["id"],
+        "title": doc.get("title", ''),
+        "description": doc.get("description", ''),
+        "content": doc.get("content", ''),
+        "source": doc.get("source", 'Unknown'),
+        "sourceUrl": doc.get("sourceUrl", ''),
+        "link": doc.get("link", ''),
+        "image": doc.get("image"),
+        "pubDate": doc.get("pubDate", ''),
+        "category": doc.get("category", 'general'),
+        "country": doc.get("country", ['bd']),
+        "language": doc.get("language", 'bn')
+    }
+
+async def news_page(category: Optional[str], limit: int,
+                    before: Optional[str] = None, since: Optional[str] = None) -> dict:
+    """One page of stored articles, newest first, with cursors for either direction"""
+    upstream_category = news_upstream_category(category)
+    query = {"categories": upstream_category} if upstream_category else {}
+    items, has_more = await keyset_page(db.news_articles, query, "published_at", limit, before, since)
+    items.reverse()
     
+    payload = {"articles": [news_article_view(doc) for doc in items], "total": len(items), "hasMore": has_more}
+    if items:
+        payload["sinceCursor"] = encode_cursor(items[0]["published_at"], items[0]["id"])
+        payload["beforeCursor"] = encode_cursor(items[-1]["published_at"], items[-1]["id"])
+    elif since is None and before is None:
+        payload["message"] = "No news found"
+    return payload
+
+async def store_news_articles(articles: List[dict]):
+    """Upsert articles by id so repeated fetches don't create duplicates"""
+    if not articles:
+        return
+    now = datetime.now(timezone.utc)
+    await db.news_articles.bulk_write([
+        UpdateOne(
+            {"id": article["id"]},
+            {"$set": article, "$setOnInsert": {"ingested_at": now}},
+            upsert=True
+        )
+        for article in articles
+    ], ordered=False)
+
+async def refresh_news(category: str = None) -> dict:
+    """Pull the latest articles into the store and return the newest page.
+
+    If NewsData.io is unavailable but the store already has articles for the
+    category, those are served instead of an error.
+    """
+    try:
+        articles = await fetch_news(category)
+        await store_news_articles(articles)
+    except HTTPException as e:
+        upstream_category = news_upstream_category(category)
+        query = {"categories": upstream_category} if upstream_category else {}
+        if not await db.news_articles.find_one(query, {"_id": 1}):
+            raise
+        logger.warning(f"Serving stored news after upstream error: {e.detail}")
+    return await news_page(category, NEWS_PAGE_SIZE)
+
+@upstream_quotas.guard("newsdata")
+@upstream_breakers["newsdata"].protect
+async def fetch_news(category: str = None) -> List[dict]:
+    """Get Bangladesh news from NewsData.io as documents for the news store"""
     news_api_key = os.environ.get('NEWS_API_KEY')
     if not news_api_key:
         raise HTTPException(status_code=500, detail="News API key not configured")
     
     try:
-        async with httpx.AsyncClient() as client:
-            # Build URL with parameters
-            url = f"https://newsdata.io/api/1/news?apikey={news_api_key}&country=bd&language=bn"
-            
-            # Add category filter if provided
-            if category and category != 'all':
-                category_map = {
-                    'national': 'politics',
-                    'international': 'world',
-                    'economy': 'business',
-                    'sports': 'sports',
-                    'technology': 'technology',
-                    'entertainment': 'entertainment'
-                }
-                mapped_category = category_map.get(category.lower(), category)
-                url += f"&category={mapped_category}"
-            
-            response = await client.get(url, timeout=10.0)
-            data = response.json()
-            
-            if data.get('status') != 'success':
-                logger.warning(f"News API returned: {data}")
-                return {"articles": [], "message": "No news found"}
-            
-            articles = []
-            for article in data.get('results', [])[:15]:  # Limit to 15 articles
-                article_info = {
-                    "id": article.get('article_id', ''),
-                    "title": article.get('title', ''),
-                    "description": article.get('description', ''),
-                    "content": article.get('content', ''),
-                    "source": article.get('source_id', 'Unknown'),
-                    "sourceUrl": article.get('source_url', ''),
-                    "link": article.get('link', ''),
-                    "image": article.get('image_url'),
-                    "pubDate": article.get('pubDate', ''),
-                    "category": article.get('category', ['general'])[0] if article.get('category') else 'general',
-                    "country": article.get('country', ['bd']),
-                    "language": article.get('language', 'bn')
-                }
-                articles.append(article_info)
-            
-            logger.info(f"News API returned {len(articles)} articles")
-            return {"articles": articles, "total": len(articles)}
-            
+        client = get_http_client()
+        # Build URL with parameters
+        url = f"https://newsdata.io/api/1/news?apikey={news_api_key}&country=bd&language=bn"
+        
+        # Add category filter if provided
+        upstream_category = news_upstream_category(category)
+        if upstream_category:
+            url += f"&category={upstream_category}"
+        
+        response = await client.get(url, timeout=10.0)
+        if response.is_error:
+            raise HTTPException(status_code=502, detail=f"News API returned {response.status_code}")
+        data = response.json()
+        
+        if data.get('status') != 'success':
+            logger.warning(f"News API returned: {data}")
+            raise HTTPException(status_code=502, detail=f"News API error: {data.get('status')}")
+        
+        now = datetime.now(timezone.utc)
+        articles = []
+        for article in data.get('results', []):
+            if not article.get('article_id'):
+                continue
+            categories = article.get('category') or ['general']
+            article_info = {
+                "id": article['article_id'],
+                "title": article.get('title', ''),
+                "description": article.get('description', ''),
+                "content": article.get('content', ''),
+                "source": article.get('source_id', 'Unknown'),
+                "sourceUrl": article.get('source_url', ''),
+                "link": article.get('link', ''),
+                "image": article.get('image_url'),
+                "pubDate": article.get('pubDate', ''),
+                "published_at": parse_pub_date(article.get('pubDate')) or now,
+                "category": categories[0],
+                "categories": categories,
+                "country": article.get('country', ['bd']),
+                "language": article.get('language', 'bn')
+            }
+            articles.append(article_info)
+        
+        logger.info(f"News API returned {len(articles)} articles")
+        return articles
+        
+    except HTTPException:
+        raise
     except httpx.TimeoutException:
         logger.error("News API timeout")
         raise HTTPException(status_code=504, detail="News API timeout")
@@ -416,151 +1601,826 @@ async def get_news(category: str = None):
 
 # Football API endpoint
 @api_router.get("/football/live")
-async def get_live_football():
-    """Get live football scores from Football-Data.org"""
-    import httpx
+async def get_live_football(request: Request):
+    """Get live football scores (cached)"""
+    payload = await football_cache.get("current", fetch_live_football)
+    return feed_responses["football"].respond(request, "current", payload)
+
+# Premier League (PL), La Liga (PD), Champions League (CL), Bundesliga, Serie A
+FOOTBALL_COMPETITIONS = [
+    {"code": "PL", "name": "প্রিমিয়ার লিগ", "nameEn": "Premier League"},
+    {"code": "PD", "name": "লা লিগা", "nameEn": "La Liga"},
+    {"code": "CL", "name": "চ্যাম্পিয়ন্স লিগ", "nameEn": "Champions League"},
+    {"code": "BL1", "name": "বুন্দেসলিগা", "nameEn": "Bundesliga"},
+    {"code": "SA", "name": "সেরি আ", "nameEn": "Serie A"},
+]
+upstream_quotas["football-data"].refresh_cost = len(FOOTBALL_COMPETITIONS)  # one request per competition
+
+# Map status to Bengali
+FOOTBALL_STATUS_MAP = {
+    'SCHEDULED': 'আসন্ন',
+    'TIMED': 'আসন্ন',
+    'LIVE': 'লাইভ',
+    'IN_PLAY': 'লাইভ',
+    'PAUSED': 'বিরতি',
+    'FINISHED': 'সম্পন্ন',
+    'POSTPONED': 'স্থগিত',
+    'CANCELLED': 'বাতিল'
+}
+
+# Total time allowed for the whole competition fan-out
+FOOTBALL_FANOUT_DEADLINE = float(os.environ.get('FOOTBALL_FANOUT_DEADLINE', '8'))
+
+async def fetch_competition_matches(client: httpx.AsyncClient, comp: dict, headers: dict) -> list:
+    """Fetch and normalize up to 5 matches for one competition"""
+    response = await client.get(
+        f"https://api.football-data.org/v4/competitions/{comp['code']}/matches?status=SCHEDULED,LIVE,IN_PLAY,PAUSED,FINISHED",
+        headers=headers,
+        timeout=10.0
+    )
+    if response.status_code != 200:
+        raise HTTPException(status_code=502, detail=f"Football API returned {response.status_code} for {comp['code']}")
     
+    matches = []
+    data = response.json()
+    for match in data.get('matches', [])[:5]:  # Limit per competition
+        home_team = match.get('homeTeam', {}).get('name', 'Home')
+        away_team = match.get('awayTeam', {}).get('name', 'Away')
+        home_score = match.get('score', {}).get('fullTime', {}).get('home')
+        away_score = match.get('score', {}).get('fullTime', {}).get('away')
+        status = match.get('status', 'SCHEDULED')
+        
+        is_live = status in ['LIVE', 'IN_PLAY', 'PAUSED']
+        
+        match_info = {
+            "id": match.get('id'),
+            "teams": f"{home_team} vs {away_team}",
+            "teamsEn": f"{home_team} vs {away_team}",
+            "homeScore": home_score if home_score is not None else 0,
+            "awayScore": away_score if away_score is not None else 0,
+            "status": FOOTBALL_STATUS_MAP.get(status, status),
+            "statusEn": status,
+            "league": comp['name'],
+            "leagueEn": comp['nameEn'],
+            "minute": match.get('minute'),
+            "isLive": is_live,
+            "utcDate": match.get('utcDate')
+        }
+        matches.append(match_info)
+    return matches
+
+@upstream_quotas.guard("football-data")
+@upstream_breakers["football-data"].protect
+async def fetch_live_football():
+    """Get live football scores from Football-Data.org"""
     football_api_key = os.environ.get('FOOTBALL_API_KEY')
     if not football_api_key:
         raise HTTPException(status_code=500, detail="Football API key not configured")
     
     try:
-        async with httpx.AsyncClient() as client:
-            # Get today's matches from major leagues
-            headers = {"X-Auth-Token": football_api_key}
-            
-            # Get matches from multiple competitions
-            matches = []
-            
-            # Premier League (PL), La Liga (PD), Champions League (CL)
-            competitions = [
-                {"code": "PL", "name": "প্রিমিয়ার লিগ", "nameEn": "Premier League"},
-                {"code": "PD", "name": "লা লিগা", "nameEn": "La Liga"},
-                {"code": "CL", "name": "চ্যাম্পিয়ন্স লিগ", "nameEn": "Champions League"},
-                {"code": "BL1", "name": "বুন্দেসলিগা", "nameEn": "Bundesliga"},
-                {"code": "SA", "name": "সেরি আ", "nameEn": "Serie A"},
-            ]
-            
-            for comp in competitions:
-                try:
-                    response = await client.get(
-                        f"https://api.football-data.org/v4/competitions/{comp['code']}/matches?status=SCHEDULED,LIVE,IN_PLAY,PAUSED,FINISHED",
-                        headers=headers,
-                        timeout=10.0
-                    )
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        for match in data.get('matches', [])[:5]:  # Limit per competition
-                            home_team = match.get('homeTeam', {}).get('name', 'Home')
-                            away_team = match.get('awayTeam', {}).get('name', 'Away')
-                            home_score = match.get('score', {}).get('fullTime', {}).get('home')
-                            away_score = match.get('score', {}).get('fullTime', {}).get('away')
-                            status = match.get('status', 'SCHEDULED')
-                            
-                            # Map status to Bengali
-                            status_map = {
-                                'SCHEDULED': 'আসন্ন',
-                                'TIMED': 'আসন্ন',
-                                'LIVE': 'লাইভ',
-                                'IN_PLAY': 'লাইভ',
-                                'PAUSED': 'বিরতি',
-                                'FINISHED': 'সম্পন্ন',
-                                'POSTPONED': 'স্থগিত',
-                                'CANCELLED': 'বাতিল'
-                            }
-                            
-                            is_live = status in ['LIVE', 'IN_PLAY', 'PAUSED']
-                            
-                            match_info = {
-                                "id": match.get('id'),
-                                "teams": f"{home_team} vs {away_team}",
-                                "teamsEn": f"{home_team} vs {away_team}",
-                                "homeScore": home_score if home_score is not None else 0,
-                                "awayScore": away_score if away_score is not None else 0,
-                                "status": status_map.get(status, status),
-                                "statusEn": status,
-                                "league": comp['name'],
-                                "leagueEn": comp['nameEn'],
-                                "minute": match.get('minute'),
-                                "isLive": is_live,
-                                "utcDate": match.get('utcDate')
-                            }
-                            matches.append(match_info)
-                except Exception as e:
-                    logger.warning(f"Error fetching {comp['code']}: {e}")
-                    continue
-            
-            logger.info(f"Football API returned {len(matches)} matches")
-            return {"matches": matches[:20], "total": len(matches)}  # Limit to 20 total
-            
-    except httpx.TimeoutException:
-        logger.error("Football API timeout")
-        raise HTTPException(status_code=504, detail="Football API timeout")
+        client = get_http_client()
+        headers = {"X-Auth-Token": football_api_key}
+        
+        # Query all competitions at once; whatever hasn't answered by the
+        # deadline is dropped so one slow league can't stall the response
+        tasks = {
+            comp['code']: asyncio.create_task(fetch_competition_matches(client, comp, headers))
+            for comp in FOOTBALL_COMPETITIONS
+        }
+        _, pending = await asyncio.wait(tasks.values(), timeout=FOOTBALL_FANOUT_DEADLINE)
+        for task in pending:
+            task.cancel()
+        
+        matches = []
+        answered = 0
+        for code, task in tasks.items():
+            if task in pending:
+                logger.warning(f"Football API deadline exceeded for {code}")
+            elif task.exception() is not None:
+                logger.warning(f"Error fetching {code}: {task.exception()}")
+            else:
+                answered += 1
+                matches.extend(task.result())
+        if not answered:
+            raise HTTPException(status_code=502, detail="Football API failed for every competition")
+        
+        logger.info(f"Football API returned {len(matches)} matches")
+        return {"matches": matches[:20], "total": len(matches)}  # Limit to 20 total
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Football API error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Football API error: {str(e)}")
 
 # Exchange Rate API endpoint
 @api_router.get("/exchange/rates")
-async def get_exchange_rates():
-    """Get live exchange rates from ExchangeRate-API"""
-    import httpx
+async def get_exchange_rates(request: Request):
+    """Get exchange rates (cached)"""
+    snapshot = await exchange_cache.get("BDT", fetch_exchange_rates)
+    return feed_responses["exchange"].respond(request, "BDT", snapshot["summary"])
+
+# Currencies shown on the rates card; conversions and history accept any code in the table
+EXCHANGE_CURRENCIES = ['USD', 'EUR', 'GBP', 'INR', 'SAR', 'AED', 'MYR', 'SGD', 'JPY', 'CNY', 'AUD', 'CAD']
+
+def cross_rate(rates: dict, source: str, target: str) -> float:
+    """Units of target per unit of source, from a table of units per 1 BDT"""
+    for code in (source, target):
+        if not rates.get(code):
+            raise HTTPException(status_code=400, detail=f"Unsupported currency: {code}")
+    return rates[target] / rates[source]
+
+@api_router.get("/exchange/convert")
+async def convert_currency(
+    source: str = Query(..., alias="from", min_length=3, max_length=3),
+    target: str = Query(..., alias="to", min_length=3, max_length=3),
+    amount: float = Query(1.0, ge=0)
+):
+    """Convert between any two currencies using the cached BDT rate table"""
+    snapshot = await exchange_cache.get("BDT", fetch_exchange_rates)
+    source, target = source.upper(), target.upper()
+    rate = cross_rate(snapshot["rates"], source, target)
+    return {
+        "from": source,
+        "to": target,
+        "amount": amount,
+        "rate": rate,
+        "result": amount * rate,
+        "lastUpdated": snapshot["lastUpdated"]
+    }
+
+@api_router.get("/exchange/history")
+async def get_exchange_history(
+    currency: str = Query(..., pattern="^[A-Za-z]{3}$"),
+    quote: str = Query("BDT", pattern="^[A-Za-z]{3}$"),
+    interval: str = Query("daily", pattern="^(daily|weekly)$"),
+    days: int = Query(90, ge=1, le=3650)
+):
+    """Price of one `currency` in `quote` over time, averaged per day or per week (from Monday)"""
+    currency, quote = currency.upper(), quote.upper()
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    snapshots = await db.exchange_rates.find(
+        {"base": "BDT", "timestamp": {"$gte": since}},
+        {"_id": 0, "timestamp": 1, f"rates.{currency}": 1, f"rates.{quote}": 1}
+    ).sort("timestamp", 1).to_list(None)
     
+    buckets = {}
+    for snapshot in snapshots:
+        rates = {"BDT": 1.0, **snapshot.get("rates", {})}
+        if not rates.get(currency) or not rates.get(quote):
+            continue
+        day = snapshot["timestamp"].date()
+        if interval == "weekly":
+            day -= timedelta(days=day.weekday())
+        buckets.setdefault(day, []).append(rates[quote] / rates[currency])
+    
+    return {
+        "currency": currency,
+        "quote": quote,
+        "interval": interval,
+        "points": [
+            {
+                "date": day.isoformat(),
+                "rate": sum(values) / len(values),
+                "min": min(values),
+                "max": max(values),
+                "samples": len(values)
+            }
+            for day, values in sorted(buckets.items())
+        ]
+    }
+
+async def store_exchange_snapshot(snapshot: dict):
+    """Append a rate table to the exchange_rates time series, once per upstream update"""
+    query = {"base": snapshot["base"], "timestamp": snapshot["updatedAt"]}
+    if await db.exchange_rates.find_one(query, {"_id": 1}):
+        return
+    await db.exchange_rates.insert_one({**query, "rates": snapshot["rates"]})
+
+@upstream_quotas.guard("exchangerate-api")
+@upstream_breakers["exchangerate-api"].protect
+async def fetch_exchange_rates():
+    """Get live exchange rates from ExchangeRate-API.
+
+    Returns the full BDT-based table plus the `summary` served by
+    /exchange/rates, and records the table in the history store.
+    """
     exchange_api_key = os.environ.get('EXCHANGE_API_KEY')
     if not exchange_api_key:
         raise HTTPException(status_code=500, detail="Exchange API key not configured")
     
     try:
-        async with httpx.AsyncClient() as client:
-            # Get rates with BDT as base
-            response = await client.get(
-                f"https://v6.exchangerate-api.com/v6/{exchange_api_key}/latest/BDT",
-                timeout=10.0
-            )
-            
-            data = response.json()
-            
-            if data.get('result') != 'success':
-                logger.warning(f"Exchange API returned: {data}")
-                raise HTTPException(status_code=500, detail="Exchange API error")
-            
-            # Get specific currencies we need
-            all_rates = data.get('conversion_rates', {})
-            
-            # Filter to relevant currencies
-            currency_list = ['USD', 'EUR', 'GBP', 'INR', 'SAR', 'AED', 'MYR', 'SGD', 'JPY', 'CNY', 'AUD', 'CAD']
-            
-            rates = {}
-            for curr in currency_list:
-                if curr in all_rates:
-                    rates[curr] = all_rates[curr]
-            
-            logger.info(f"Exchange API returned rates for {len(rates)} currencies")
-            return {
+        client = get_http_client()
+        # Get rates with BDT as base
+        response = await client.get(
+            f"https://v6.exchangerate-api.com/v6/{exchange_api_key}/latest/BDT",
+            timeout=10.0
+        )
+        if response.is_error:
+            raise HTTPException(status_code=502, detail=f"Exchange API returned {response.status_code}")
+        data = response.json()
+        
+        if data.get('result') != 'success':
+            logger.warning(f"Exchange API returned: {data}")
+            raise HTTPException(status_code=502, detail="Exchange API error")
+        
+        all_rates = {"BDT": 1.0, **data.get('conversion_rates', {})}
+        
+        # Filter to relevant currencies
+        rates = {}
+        for curr in EXCHANGE_CURRENCIES:
+            if curr in all_rates:
+                rates[curr] = all_rates[curr]
+        
+        updated_unix = data.get('time_last_update_unix')
+        snapshot = {
+            "base": "BDT",
+            "rates": all_rates,
+            "lastUpdated": data.get('time_last_update_utc', ''),
+            "updatedAt": datetime.fromtimestamp(updated_unix, timezone.utc) if updated_unix else datetime.now(timezone.utc),
+            "summary": {
                 "base": "BDT",
                 "rates": rates,
                 "lastUpdated": data.get('time_last_update_utc', '')
             }
-            
+        }
+        logger.info(f"Exchange API returned rates for {len(all_rates)} currencies")
+        
+    except HTTPException:
+        raise
     except httpx.TimeoutException:
         logger.error("Exchange API timeout")
         raise HTTPException(status_code=504, detail="Exchange API timeout")
     except Exception as e:
         logger.error(f"Exchange API error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Exchange API error: {str(e)}")
+    
+    try:
+        await store_exchange_snapshot(snapshot)
+    except Exception as e:
+        # History is a nice-to-have; never fail the live rates over it
+        logger.warning(f"Could not record exchange rate history: {str(e)}")
+    return snapshot
+
+# Prayer times
+def district_view(district) -> dict:
+    return {
+        "id": district.id,
+        "name": district.name,
+        "nameEn": district.name_en,
+        "division": district.division,
+        "latitude": district.latitude,
+        "longitude": district.longitude
+    }
+
+def dhaka_today():
+    return (datetime.now(timezone.utc) + timedelta(hours=6)).date()
+
+def compute_prayer_table(year: int, method: str, school: str):
+    start = time.perf_counter()
+    table = compute_year(year, method, school)
+    logger.info(f"Computed {year} prayer times ({method}, {school}) in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return table
+
+async def get_prayer_table(year: int, method: str, school: str):
+    """Yearly table for all districts, computed off the event loop on first use.
+
+    The cache holds the computing task, so concurrent first requests share it.
+    A task that fails is evicted, so the next request computes the table again.
+    """
+    key = (year, method, school)
+    task = prayer_tables.get(key)
+    if task is None:
+        task = asyncio.ensure_future(asyncio.to_thread(compute_prayer_table, year, method, school))
+        task.add_done_callback(functools.partial(forget_failed_prayer_table, key))
+        prayer_tables[key] = task
+    return await task
+
+def forget_failed_prayer_table(key: tuple, task: asyncio.Future):
+    if (task.cancelled() or task.exception() is not None) and prayer_tables.get(key) is task:
+        prayer_tables.pop(key)
+
+@api_router.get("/prayer/districts")
+async def get_prayer_districts():
+    """Districts, calculation methods and Asr schools accepted by /prayer/times"""
+    return {
+        "districts": [district_view(d) for d in DISTRICTS],
+        "methods": {key: method.name for key, method in METHODS.items()},
+        "schools": list(ASR_SCHOOLS),
+        "default": {"method": PRAYER_METHOD, "school": PRAYER_ASR_SCHOOL}
+    }
+
+@api_router.get("/prayer/times")
+async def get_prayer_times(
+    request: Request,
+    district: str = "dhaka",
+    date: Optional[str] = None,
+    days: int = Query(1, ge=1, le=31),
+    method: Optional[str] = None,
+    school: Optional[str] = None
+):
+    """Prayer times for a district, from `date` (default today in Bangladesh) for `days` days.
+
+    Times are 24-hour HH:MM in Bangladesh Standard Time.
+    """
+    method = method or PRAYER_METHOD
+    school = school or PRAYER_ASR_SCHOOL
+    if method not in METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown method, expected one of: {', '.join(METHODS)}")
+    if school not in ASR_SCHOOLS:
+        raise HTTPException(status_code=400, detail=f"Unknown school, expected one of: {', '.join(ASR_SCHOOLS)}")
+    found = find_district(district)
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"Unknown district: {district}")
+    try:
+        start = datetime.strptime(date, "%Y-%m-%d").date() if date else dhaka_today()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
+    if not 1900 <= start.year <= 2100:
+        raise HTTPException(status_code=400, detail="date must be between 1900 and 2100")
+    
+    key = (found.id, start, days, method, school)
+    page = prayer_pages.get(key)
+    if page is None:
+        index = DISTRICT_INDEX[found.id]
+        entries = []
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            row = (await get_prayer_table(day.year, method, school))[index, day.timetuple().tm_yday - 1]
+            entries.append({
+                "date": day.isoformat(),
+                "hijri": hijri_date(day, PRAYER_HIJRI_ADJUSTMENT),
+                "timings": {prayer: format_minutes(minutes) for prayer, minutes in zip(PRAYERS, row)}
+            })
+        page = {
+            "district": district_view(found),
+            "method": method,
+            "school": school,
+            "timezone": "Asia/Dhaka",
+            "days": entries
+        }
+        prayer_pages[key] = page
+    return prayer_responses.respond(request, key, page)
+
+# Live score push: one poller per feed shared by every subscribed client.
+# Polls read through the feed caches, so REST readers see the same data and
+# upstream calls follow the feeds' quota-aware refresh intervals.
+live_feeds = {
+    "cricket": LiveFeed(
+        "cricket",
+        lambda: cricket_cache.get("current", fetch_live_cricket),
+        interval=float(os.environ.get('LIVE_CRICKET_POLL_INTERVAL', '30'))
+    ),
+    "football": LiveFeed(
+        "football",
+        lambda: football_cache.get("current", fetch_live_football),
+        interval=float(os.environ.get('LIVE_FOOTBALL_POLL_INTERVAL', '60'))
+    ),
+}
+
+@api_router.get("/live/{feed}/stream")
+async def stream_live_scores(feed: str, http_request: Request):
+    """Push live score changes as Server-Sent Events.
+
+    The first `snapshot` event carries every match; later `delta` events
+    list added matches, changed fields of updated matches and removed ids.
+    """
+    live_feed = live_feeds.get(feed)
+    if live_feed is None:
+        raise HTTPException(status_code=404, detail=f"Unknown live feed: {feed}")
+    
+    queue = await live_feed.subscribe()
+    
+    async def event_stream():
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await http_request.is_disconnected():
+                        return
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(frame["type"], frame)
+        finally:
+            live_feed.unsubscribe(queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/upstream/quota")
+async def get_upstream_quota():
+    """Requests used and left today for each data provider's API key"""
+    return {"providers": upstream_quotas.snapshot()}
+
+FEED_CACHES = (cricket_cache, news_cache, football_cache, exchange_cache)
+
+def feed_cache_stats(feed_cache: FeedCache) -> dict:
+    return {"hit": feed_cache.hits, "stale": feed_cache.stale_hits, "miss": feed_cache.misses}
+
+def cache_request_totals():
+    for feed_cache in FEED_CACHES:
+        for result, count in feed_cache_stats(feed_cache).items():
+            yield [feed_cache.name, result], count
+    caches = [("translation", translation_cache_stats)]
+    if CHAT_RESPONSE_CACHE:
+        caches.append(("chat_response", chat_response_cache_stats))
+    for name, stats in caches:
+        for result, count in stats.items():
+            yield [name, result], count
+
+# Running totals are kept by the objects that count them and read at scrape time
+register_totals("bdask_cache_requests", "Cache lookups, by cache and result", ["cache", "result"],
+                cache_request_totals)
+register_totals("bdask_feed_not_modified", "Feed requests answered 304 Not Modified", ["feed"],
+                lambda: (([feed], responses.not_modified) for feed, responses in feed_responses.items()))
+register_totals("bdask_feed_fallbacks", "Feed requests served the last good payload after a failed refresh",
+                ["feed"], lambda: (([c.name], c.fallbacks) for c in FEED_CACHES))
+register_totals("bdask_circuit_rejected", "Calls refused by an open circuit breaker", ["breaker"],
+                lambda: (([b.name], b.rejected) for b in (*upstream_breakers.values(), llm_breaker)))
+register_totals("bdask_llm_rejected", "LLM calls rejected by admission control", [],
+                lambda: [([], llm_limiter.rejected)])
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics for this worker"""
+    for feed_cache in FEED_CACHES:
+        record_cache_stats(feed_cache.name, feed_cache_stats(feed_cache), ("hit", "stale"))
+    for provider, quota in upstream_quotas.quotas.items():
+        remaining = quota.remaining_today()
+        if remaining is not None:
+            UPSTREAM_QUOTA_REMAINING.labels(provider).set(remaining)
+    for breaker in (*upstream_breakers.values(), llm_breaker):
+        CIRCUIT_STATE.labels(breaker.name).set(STATE_VALUES[breaker.state])
+    record_cache_stats("translation", translation_cache_stats, ("memory_hits", "db_hits"))
+    if CHAT_RESPONSE_CACHE:
+        record_cache_stats("chat_response", chat_response_cache_stats, ("hits",))
+    CHAT_SESSIONS_CACHED.set(len(chat_sessions))
+    LLM_IN_FLIGHT.set(llm_limiter.in_flight)
+    LLM_QUEUED.set(llm_limiter.waiting)
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template so path parameters don't explode cardinality
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            request.method, route.path if route else "unmatched", str(status)
+        ).observe(time.perf_counter() - start)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Before-Cursor", "X-After-Cursor", "X-Has-More"],
 )
 
+# Timestamp fields that older deployments stored as ISO-8601 strings
+DATETIME_FIELDS = {
+    "chat_messages": ["timestamp"],
+    "chat_sessions": ["created_at", "updated_at"],
+    "status_checks": ["timestamp"],
+    "translations": ["created_at"],
+}
+
+async def ensure_exchange_history():
+    """Create exchange_rates as a time-series collection where MongoDB supports it (5.0+)"""
+    if "exchange_rates" not in await db.list_collection_names():
+        try:
+            await db.create_collection(
+                "exchange_rates",
+                timeseries={"timeField": "timestamp", "metaField": "base", "granularity": "hours"}
+            )
+        except Exception as e:
+            logger.info(f"exchange_rates created as a regular collection: {str(e)}")
+    await db.exchange_rates.create_index([("base", 1), ("timestamp", 1)])
+
+async def ensure_indexes():
+    """Create the indexes the chat, status and news queries rely on (idempotent)"""
+    indexes = [
+        (db.chat_messages, [("session_id", 1), ("timestamp", 1), ("id", 1)], {}),
+        (db.chat_messages, "id", {"unique": True}),
+        # Serves search's newest-first candidate scan without an in-memory sort
+        (db.chat_messages, [("search_terms", 1), ("timestamp", -1)], {}),
+        (db.chat_sessions, "id", {"unique": True}),
+        (db.chat_sessions, [("updated_at", -1), ("id", -1)], {}),
+        (db.upstream_usage, [("provider", 1), ("day", 1)], {"unique": True}),
+        # Expired leases are free to take anyway; this just clears them out
+        (db.leases, "expires_at", {"expireAfterSeconds": 3600}),
+        (db.status_checks, [("timestamp", -1)], {}),
+        (db.chat_archives, "session_id", {"unique": True}),
+        (db.chat_archives, "search_terms", {}),
+        (db.chat_archives, [("last_timestamp", -1)], {}),
+        (db.news_articles, "id", {"unique": True}),
+        (db.news_articles, [("published_at", -1), ("id", -1)], {}),
+        (db.news_articles, [("categories", 1), ("published_at", -1), ("id", -1)], {}),
+    ]
+    # One bad index (e.g. duplicates blocking a unique one) shouldn't cost the others
+    failed = 0
+    for collection, keys, options in indexes:
+        try:
+            await collection.create_index(keys, **options)
+        except Exception as e:
+            failed += 1
+            logger.error(f"Could not create index {keys} on {collection.name}: {str(e)}")
+    await ensure_ttl_index(db.status_checks, "timestamp", STATUS_CHECK_RETENTION_DAYS * 86400)
+    await ensure_ttl_index(db.translations, "created_at", TRANSLATION_CACHE_RETENTION_DAYS * 86400)
+    if failed:
+        raise RuntimeError(f"{failed} of {len(indexes)} indexes could not be created")
+
+async def ensure_ttl_index(collection, field: str, seconds: float):
+    """Keep a TTL index on `field` expiring documents after `seconds` (0 removes it)"""
+    name = f"{field}_ttl"
+    seconds = int(seconds)
+    existing = (await collection.index_information()).get(name)
+    if not seconds:
+        if existing:
+            await collection.drop_index(name)
+        return
+    if existing is None:
+        await collection.create_index(field, name=name, expireAfterSeconds=seconds)
+    elif existing.get("expireAfterSeconds") != seconds:
+        await db.command("collMod", collection.name, index={"name": name, "expireAfterSeconds": seconds})
+
+async def migrate_string_datetimes():
+    """One-time conversion of ISO string timestamps to native BSON dates"""
+    migration_id = "native_datetimes_v1"
+    if await db.migrations.find_one({"_id": migration_id}):
+        return
+    
+    for collection, fields in DATETIME_FIELDS.items():
+        for field in fields:
+            result = await db[collection].update_many(
+                {field: {"$type": "string"}},
+                # Unparseable strings are left as they are rather than failing the migration
+                [{"$set": {field: {"$dateFromString": {"dateString": f"${field}", "onError": f"${field}"}}}}]
+            )
+            if result.modified_count:
+                logger.info(f"Migrated {result.modified_count} {collection}.{field} values to dates")
+    
+    await db.migrations.insert_one({"_id": migration_id, "applied_at": datetime.now(timezone.utc)})
+
+# Messages whose stored search terms are missing or predate a change to
+# search.py, and whether archives' combined terms need rebuilding too
+SEARCH_TERM_MIGRATIONS = [
+    ("chat_search_terms_v1", {"search_terms": {"$exists": False}}, False),  # stored before chat search existed
+    ("chat_search_terms_v2", {"content": {"$regex": "্য|ক্ষ"}}, False),  # ya-phala and ksha fold differently
+    ("chat_search_terms_v3", {}, True),  # stopwords and the minimum fold key length
+]
+
+async def backfill_search_terms(batch_size: int = 500):
+    """One-time (re)indexing of messages for each search terms migration"""
+    for migration_id, query, archives in SEARCH_TERM_MIGRATIONS:
+        try:
+            if await db.migrations.find_one({"_id": migration_id}):
+                continue
+            
+            indexed = 0
+            batch = []
+            async for doc in db.chat_messages.find(query, {"_id": 1, "content": 1}):
+                batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"search_terms": index_terms(doc.get("content") or "")}}))
+                if len(batch) >= batch_size:
+                    await db.chat_messages.bulk_write(batch, ordered=False)
+                    indexed += len(batch)
+                    batch = []
+            if batch:
+                await db.chat_messages.bulk_write(batch, ordered=False)
+                indexed += len(batch)
+            if archives:
+                await reindex_archive_terms(batch_size)
+            
+            await db.migrations.insert_one({"_id": migration_id, "applied_at": datetime.now(timezone.utc)})
+            if indexed:
+                logger.info(f"Indexed {indexed} existing chat messages for search ({migration_id})")
+        except Exception as e:
+            logger.error(f"Chat search backfill {migration_id} failed: {str(e)}")
+            return
+
+async def reindex_archive_terms(batch_size: int = 100):
+    """Recompute every archive's combined search terms from its messages"""
+    batch = []
+    async for archive in db.chat_archives.find({}, {"_id": 1, "codec": 1, "data": 1}):
+        terms = set()
+        for message in unpack_messages(archive):
+            terms.update(index_terms(message.get("content") or ""))
+        batch.append(UpdateOne({"_id": archive["_id"]}, {"$set": {"search_terms": sorted(terms)}}))
+        if len(batch) >= batch_size:
+            await db.chat_archives.bulk_write(batch, ordered=False)
+            batch = []
+    if batch:
+        await db.chat_archives.bulk_write(batch, ordered=False)
+
+async def archive_session(session: dict) -> int:
+    """Move a session's live messages into its compressed archive; returns how many moved"""
+    session_id = session["id"]
+    live = await db.chat_messages.find({"session_id": session_id}, {"_id": 0}).to_list(None)
+    if not live:
+        await db.chat_sessions.update_one({"id": session_id}, {"$set": {"archived_at": session["updated_at"]}})
+        return 0
+    
+    terms = set()
+    for message in live:
+        terms.update(message.pop("search_terms", None) or index_terms(message.get("content") or ""))
+    existing = await db.chat_archives.find_one({"session_id": session_id}, {"_id": 0})
+    if existing:
+        terms.update(existing.get("search_terms", []))
+        messages = merge_messages(unpack_messages(existing), live)
+    else:
+        messages = merge_messages(live)
+    
+    await db.chat_archives.replace_one(
+        {"session_id": session_id},
+        {
+            "session_id": session_id,
+            **pack_messages(messages),
+            "search_terms": sorted(terms),
+            "archived_at": datetime.now(timezone.utc)
+        },
+        upsert=True
+    )
+    # Only delete once the archive holding them is written
+    await db.chat_messages.delete_many({"session_id": session_id, "id": {"$in": [m["id"] for m in live]}})
+    await db.chat_sessions.update_one({"id": session_id}, {"$set": {"archived_at": session["updated_at"]}})
+    return len(live)
+
+async def run_archive_pass() -> dict:
+    """One retention and archiving pass over idle chat sessions"""
+    now = datetime.now(timezone.utc)
+    stats = {"expired": 0, "empty": 0, "archived_sessions": 0, "archived_messages": 0}
+    
+    if CHAT_SESSION_RETENTION_DAYS:
+        cutoff = now - timedelta(days=CHAT_SESSION_RETENTION_DAYS)
+        async for session in db.chat_sessions.find({"updated_at": {"$lt": cutoff}}, {"_id": 0, "id": 1}).limit(CHAT_ARCHIVE_BATCH):
+            await purge_session(session["id"])
+            stats["expired"] += 1
+    
+    if CHAT_EMPTY_SESSION_TTL_HOURS:
+        cutoff = now - timedelta(hours=CHAT_EMPTY_SESSION_TTL_HOURS)
+        candidates = db.chat_sessions.find(
+            {"updated_at": {"$lt": cutoff}, "archived_at": {"$exists": False}, "has_history": {"$exists": False}},
+            {"_id": 0, "id": 1}
+        ).limit(CHAT_ARCHIVE_BATCH)
+        async for session in candidates:
+            session_id = session["id"]
+            if (await db.chat_messages.find_one({"session_id": session_id}, {"_id": 1})
+                    or await db.chat_archives.find_one({"session_id": session_id}, {"_id": 1})):
+                # Not empty; don't look at it again
+                await db.chat_sessions.update_one({"id": session_id}, {"$set": {"has_history": True}})
+                continue
+            await purge_session(session_id)
+            stats["empty"] += 1
+    
+    if CHAT_ARCHIVE_AFTER_DAYS:
+        cutoff = now - timedelta(days=CHAT_ARCHIVE_AFTER_DAYS)
+        candidates = db.chat_sessions.find(
+            {"updated_at": {"$lt": cutoff}, "$or": [
+                {"archived_at": {"$exists": False}},
+                {"$expr": {"$gt": ["$updated_at", "$archived_at"]}}
+            ]},
+            {"_id": 0, "id": 1, "updated_at": 1}
+        ).limit(CHAT_ARCHIVE_BATCH)
+        async for session in candidates:
+            moved = await archive_session(session)
+            stats["archived_sessions"] += 1
+            stats["archived_messages"] += moved
+    
+    return stats
+
+async def archive_loop():
+    """Run the archive pass every CHAT_ARCHIVE_INTERVAL seconds in one worker at a time"""
+    await asyncio.sleep(min(30.0, CHAT_ARCHIVE_INTERVAL))
+    while True:
+        try:
+            # Only one worker runs each pass
+            if await leases.try_acquire("chat_archive", CHAT_ARCHIVE_INTERVAL * 0.9, WORKER_ID):
+                stats = await run_archive_pass()
+                if any(stats.values()):
+                    logger.info(f"Chat archive pass: {stats}")
+        except Exception as e:
+            logger.error(f"Chat archive pass failed: {str(e)}")
+        await asyncio.sleep(CHAT_ARCHIVE_INTERVAL)
+
+# Seconds spent in each startup phase, logged once startup completes
+startup_timings = {}
+
+def profiled_startup(hook):
+    """Record how long a startup hook takes"""
+    @functools.wraps(hook)
+    async def wrapper():
+        start = time.perf_counter()
+        try:
+            await hook()
+        finally:
+            startup_timings[hook.__name__] = time.perf_counter() - start
+    return wrapper
+
+@app.on_event("startup")
+@profiled_startup
+async def startup_db():
+    # Each step runs on its own so one failure doesn't skip the rest; serving
+    # without indexes is slow, not broken, so none of them blocks startup
+    for step in (migrate_string_datetimes, ensure_indexes, ensure_exchange_history, upstream_quotas.load):
+        try:
+            await step()
+        except Exception as e:
+            logger.error(f"Database bootstrap step {step.__name__} failed: {str(e)}")
+    spawn_background(backfill_search_terms())
+
+@app.on_event("startup")
+@profiled_startup
+async def startup_chat_writer():
+    global chat_writer
+    if CHAT_WRITE_BEHIND:
+        chat_writer = ChatWriteBehind(db, flush_interval=CHAT_WRITE_BEHIND_INTERVAL)
+        chat_writer.start()
+        logger.info("Chat write-behind enabled")
+        if CHAT_SESSION_STORE == 'mongo':
+            logger.warning("CHAT_WRITE_BEHIND with CHAT_SESSION_STORE=mongo: a turn served by another "
+                           "worker may not see messages still in this worker's buffer")
+
+@app.on_event("startup")
+@profiled_startup
+async def startup_archiver():
+    global archive_task
+    if CHAT_ARCHIVE_AFTER_DAYS or CHAT_EMPTY_SESSION_TTL_HOURS or CHAT_SESSION_RETENTION_DAYS:
+        archive_task = asyncio.create_task(archive_loop())
+
+@app.on_event("startup")
+@profiled_startup
+async def startup_http_client():
+    get_http_client()
+
+@app.on_event("startup")
+@profiled_startup
+async def warm_up():
+    """Open a MongoDB connection now; load the LLM client and this year's prayer table off the event loop"""
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        logger.warning(f"MongoDB warm-up ping failed: {str(e)}")
+    if LLM_PRELOAD and isinstance(LlmChat, LazyImport) and not LlmChat.loaded:
+        spawn_background(preload_llm_client())
+    spawn_background(get_prayer_table(dhaka_today().year, PRAYER_METHOD, PRAYER_ASR_SCHOOL))
+
+async def preload_llm_client():
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(LlmChat.load)
+        await asyncio.to_thread(UserMessage.load)
+        if LLM_STREAM_API_KEY:
+            await asyncio.to_thread(acompletion.load)
+    except Exception as e:
+        logger.warning(f"LLM client preload failed, it will load on first use: {str(e)}")
+        return
+    logger.info(f"LLM client loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+@app.on_event("startup")
+async def report_startup():
+    """Log and export where cold-start time went"""
+    phases = {"import": IMPORT_SECONDS, **startup_timings}
+    for phase, seconds in phases.items():
+        STARTUP_SECONDS.labels(phase).set(seconds)
+    breakdown = ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in phases.items())
+    logger.info(f"Startup took {(time.perf_counter() - IMPORT_STARTED) * 1000:.0f} ms ({breakdown})")
+
+@app.on_event("shutdown")
+async def shutdown_chat_writer():
+    if chat_writer is not None:
+        await chat_writer.close()
+        logger.info(f"Chat write-behind drained ({chat_writer.flushed} messages written)")
+
+@app.on_event("shutdown")
+async def shutdown_archiver():
+    if archive_task is not None:
+        archive_task.cancel()
+
+@app.on_event("shutdown")
+async def shutdown_live_feeds():
+    for live_feed in live_feeds.values():
+        await live_feed.close()
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    if http_client is not None:
+        await http_client.aclose()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
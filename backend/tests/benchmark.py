@@ -0,0 +1,226 @@
+"""
+BdAsk.com Backend Benchmark
+Runs the FastAPI app in-process against offline stand-ins (tests/fakes.py),
+drives a mixed workload and reports throughput and latency per endpoint.
+
+Usage (from backend/):
+    python tests/benchmark.py --duration 30 --users 50
+    python tests/benchmark.py --json results.json --llm-latency 1.0
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# server.py reads these at import time; nothing here talks to real services
+os.environ.setdefault('MONGO_URL', 'mongodb://benchmark.invalid:27017')
+os.environ.setdefault('DB_NAME', 'bdask_benchmark')
+for key in ['EMERGENT_LLM_KEY', 'CRICKET_API_KEY', 'NEWS_API_KEY', 'FOOTBALL_API_KEY', 'EXCHANGE_API_KEY']:
+    os.environ.setdefault(key, 'benchmark')
+
+from fakes import FakeLlmChat, FakeUpstreams, install_fakes  # noqa: E402
+
+COMMON_QUESTIONS = [
+    "হ্যালো, তুমি কে?",
+    "তুমি কী কী করতে পারো?",
+    "বাংলাদেশের রাজধানী কোথায়?",
+    "ami kibhabe passport renew korbo?",
+    "আজকের আবহাওয়া কেমন?",
+]
+
+TRANSLATION_PHRASES = ["Hello", "Thank you", "Good morning", "How are you?", "ধন্যবাদ", "শুভ সকাল"]
+
+
+class Workload:
+    """Weighted mix of realistic client calls against a pool of sessions"""
+
+    def __init__(self, client: httpx.AsyncClient, session_ids: list):
+        self.client = client
+        self.session_ids = session_ids
+        self.operations = [
+            (20, "POST /api/chat/send", self.chat_send),
+            (5, "POST /api/chat/stream", self.chat_stream),
+            (15, "GET /api/chat/messages", self.chat_messages),
+            (8, "GET /api/chat/sessions", self.chat_sessions),
+            (10, "POST /api/translate", self.translate),
+            (2, "POST /api/translate/batch", self.translate_batch),
+            (12, "GET /api/cricket/live", self.cricket),
+            (10, "GET /api/football/live", self.football),
+            (10, "GET /api/news", self.news),
+            (8, "GET /api/exchange/rates", self.exchange),
+        ]
+        self.weights = [weight for weight, _, _ in self.operations]
+
+    def pick(self):
+        _, name, call = random.choices(self.operations, weights=self.weights)[0]
+        return name, call
+
+    async def chat_send(self):
+        return await self.client.post("/api/chat/send", json={
+            "session_id": random.choice(self.session_ids),
+            "message": random.choice(COMMON_QUESTIONS)
+        })
+
+    async def chat_stream(self):
+        return await self.client.post("/api/chat/stream", json={
+            "session_id": random.choice(self.session_ids),
+            "message": random.choice(COMMON_QUESTIONS)
+        })
+
+    async def chat_messages(self):
+        return await self.client.get(f"/api/chat/messages/{random.choice(self.session_ids)}", params={"limit": 50})
+
+    async def chat_sessions(self):
+        return await self.client.get("/api/chat/sessions", params={"limit": 20})
+
+    async def translate(self):
+        return await self.client.post("/api/translate", json={
+            "text": random.choice(TRANSLATION_PHRASES), "source": "en", "target": "bn"
+        })
+
+    async def translate_batch(self):
+        return await self.client.post("/api/translate/batch", json={
+            "segments": random.sample(TRANSLATION_PHRASES, 4), "source": "en", "target": "bn"
+        })
+
+    async def cricket(self):
+        return await self.client.get("/api/cricket/live")
+
+    async def football(self):
+        return await self.client.get("/api/football/live")
+
+    async def news(self):
+        category = random.choice([None, "sports", "economy"])
+        return await self.client.get("/api/news", params={"category": category} if category else None)
+
+    async def exchange(self):
+        return await self.client.get("/api/exchange/rates")
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: dict, errors: dict, elapsed: float) -> dict:
+    report = {}
+    for name in sorted(samples):
+        values = sorted(samples[name])
+        report[name] = {
+            "count": len(values),
+            "errors": errors.get(name, 0),
+            "rps": len(values) / elapsed,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    all_values = sorted(v for values in samples.values() for v in values)
+    report["TOTAL"] = {
+        "count": len(all_values),
+        "errors": sum(errors.values()),
+        "rps": len(all_values) / elapsed,
+        "p50_ms": percentile(all_values, 50) * 1000,
+        "p95_ms": percentile(all_values, 95) * 1000,
+        "p99_ms": percentile(all_values, 99) * 1000,
+    }
+    return report
+
+
+def print_report(report: dict, elapsed: float, upstreams: FakeUpstreams):
+    print(f"\nRan for {elapsed:.1f}s, {FakeLlmChat.calls} LLM calls, upstream calls: {upstreams.calls}\n")
+    header = f"{'endpoint':<30} {'count':>7} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, row in report.items():
+        print(f"{name:<30} {row['count']:>7} {row['errors']:>7} {row['rps']:>8.1f} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+
+
+async def run(args) -> dict:
+    import server
+    logging.getLogger().setLevel(args.log_level)
+
+    FakeLlmChat.first_token_latency = args.llm_latency
+    FakeLlmChat.tokens_per_second = args.token_rate
+    FakeLlmChat.reply_tokens = args.reply_tokens
+    upstreams = FakeUpstreams(latency=args.upstream_latency, error_rate=args.upstream_error_rate)
+    install_fakes(server, upstreams)
+
+    await server.app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60.0) as client:
+            session_ids = []
+            for i in range(args.sessions):
+                response = await client.post("/api/chat/session", json={"title": f"BENCH_{i}"})
+                session_ids.append(response.json()["id"])
+
+            workload = Workload(client, session_ids)
+            samples = defaultdict(list)
+            errors = defaultdict(int)
+            deadline = time.perf_counter() + args.duration
+
+            async def user():
+                while time.perf_counter() < deadline:
+                    name, call = workload.pick()
+                    start = time.perf_counter()
+                    try:
+                        response = await call()
+                        failed = response.status_code >= 400
+                    except Exception:
+                        failed = True
+                    samples[name].append(time.perf_counter() - start)
+                    if failed:
+                        errors[name] += 1
+                    if args.think_time:
+                        await asyncio.sleep(random.expovariate(1 / args.think_time))
+
+            started = time.perf_counter()
+            await asyncio.gather(*[user() for _ in range(args.users)])
+            elapsed = time.perf_counter() - started
+    finally:
+        await server.app.router.shutdown()
+
+    report = summarize(samples, errors, elapsed)
+    print_report(report, elapsed, upstreams)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--sessions", type=int, default=100, help="chat sessions to spread chat traffic over")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between a user's requests (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="fake LLM time to first token (s)")
+    parser.add_argument("--token-rate", type=float, default=80.0, help="fake LLM tokens per second")
+    parser.add_argument("--reply-tokens", type=int, default=60, help="fake LLM reply length in tokens")
+    parser.add_argument("--upstream-latency", type=float, default=0.15, help="fake data API latency (s)")
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0, help="fraction of data API calls that 503")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    report = asyncio.run(run(args))
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Settings for the in-process tests, which import server.py against the offline
+stand-ins in tests/fakes.py. They must be in place before the first of those
+test modules imports server, whichever pytest collects first.
+"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+os.environ.setdefault('MONGO_URL', 'mongodb://offline-test.invalid:27017')
+os.environ.setdefault('DB_NAME', 'bdask_offline_test')
+for key in ['EMERGENT_LLM_KEY', 'CRICKET_API_KEY', 'FOOTBALL_API_KEY']:
+    os.environ.setdefault(key, 'test')
+
+# Feeds refresh on every request, with no quota pacing, so each request
+# reaches the fake upstream
+for key in ['CRICKET_CACHE_TTL', 'CRICKET_CACHE_STALE_TTL', 'CRICKET_IDLE_CACHE_TTL',
+            'FOOTBALL_CACHE_TTL', 'FOOTBALL_CACHE_STALE_TTL', 'FOOTBALL_IDLE_CACHE_TTL']:
+    os.environ[key] = '0'
+os.environ['CRICKET_DAILY_QUOTA'] = ''
+os.environ['FOOTBALL_MINUTE_QUOTA'] = ''
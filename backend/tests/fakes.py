@@ -0,0 +1,190 @@
+"""
+Offline stand-ins for MongoDB, the LLM and the upstream data APIs.
+
+Used by the benchmark harness to run the real FastAPI app in-process with
+no network access. Latencies are configurable so runs can model a slow
+model or a slow upstream.
+"""
+import asyncio
+import json
+import random
+from types import SimpleNamespace
+
+import httpx
+from mongomock_motor import AsyncMongoMockClient
+
+
+class FakeUserMessage:
+    """Drop-in for emergentintegrations' UserMessage"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeLlmChat:
+    """Drop-in for emergentintegrations' LlmChat with simulated latency.
+
+    A reply costs `first_token_latency` plus `reply_tokens / tokens_per_second`
+    seconds. Translation batch prompts get a well-formed JSON array back so
+    the batch path is exercised rather than its fallback.
+    """
+    first_token_latency = 0.3
+    tokens_per_second = 80.0
+    reply_tokens = 60
+    calls = 0
+
+    def __init__(self, api_key, session_id, system_message, initial_messages=None):
+        self.session_id = session_id
+        self.messages = [{"role": "system", "content": system_message}]
+        self.messages.extend(initial_messages or [])
+
+    def with_model(self, provider, model):
+        return self
+
+    async def send_message(self, user_message):
+        cls = type(self)
+        cls.calls += 1
+        await asyncio.sleep(cls.first_token_latency + cls.reply_tokens / cls.tokens_per_second)
+
+        text = user_message.text
+        if "JSON array" in text:
+            segments = json.loads(text[text.rindex("\n\n") + 2:])
+            reply = json.dumps([f"অনুবাদ {segment}" for segment in segments], ensure_ascii=False)
+        else:
+            reply = " ".join(["উত্তর"] * cls.reply_tokens)
+
+        self.messages.append({"role": "user", "content": text})
+        self.messages.append({"role": "assistant", "content": reply})
+        return reply
+
+
+class FakeCompletionStream:
+    """Drop-in for litellm.acompletion(..., stream=True).
+
+    Streams FakeLlmChat's reply a few words per chunk at its token rate,
+    after its first-token latency. The prompt messages are kept in
+    `requests` so tests can check the context that was sent.
+    """
+    words_per_chunk = 4
+
+    def __init__(self):
+        self.requests = []
+
+    async def __call__(self, model, messages, stream=False, **kwargs):
+        self.requests.append(messages)
+        return self.chunks()
+
+    async def chunks(self):
+        await asyncio.sleep(FakeLlmChat.first_token_latency)
+        words = ["উত্তর"] * FakeLlmChat.reply_tokens
+        for i in range(0, len(words), self.words_per_chunk):
+            await asyncio.sleep(self.words_per_chunk / FakeLlmChat.tokens_per_second)
+            text = " ".join(words[i:i + self.words_per_chunk]) + " "
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def cricket_payload():
+    matches = []
+    for i in range(12):
+        matches.append({
+            "id": f"match-{i}",
+            "name": f"Team {i} vs Team {i + 1}",
+            "status": random.choice(["Live", "Innings break", "Stumps"]),
+            "venue": "Sher-e-Bangla National Stadium, Mirpur",
+            "date": "2026-10-17",
+            "matchType": random.choice(["t20", "odi", "test"]),
+            "teams": [f"Team {i}", f"Team {i + 1}"],
+            "score": [{"r": random.randint(50, 300), "w": random.randint(0, 10), "o": 20, "inning": f"Team {i} Inning 1"}],
+            "series_id": "series-1",
+            "matchStarted": True,
+            "matchEnded": False,
+        })
+    return {"status": "success", "data": matches}
+
+
+def news_payload():
+    results = []
+    for i in range(20):
+        results.append({
+            "article_id": f"article-{i}",
+            "title": f"শিরোনাম {i}",
+            "description": "বিস্তারিত " * 20,
+            "content": "সংবাদ " * 100,
+            "source_id": "prothomalo",
+            "source_url": "https://www.prothomalo.com",
+            "link": f"https://www.prothomalo.com/{i}",
+            "image_url": None,
+            "pubDate": f"2026-10-17 {i % 24:02d}:00:00",
+            "category": ["politics"],
+            "country": ["bangladesh"],
+            "language": "bengali",
+        })
+    return {"status": "success", "results": results}
+
+
+def football_payload():
+    matches = []
+    for i in range(8):
+        matches.append({
+            "id": random.randint(1, 10 ** 6),
+            "homeTeam": {"name": f"Home {i}"},
+            "awayTeam": {"name": f"Away {i}"},
+            "score": {"fullTime": {"home": random.randint(0, 3), "away": random.randint(0, 3)}},
+            "status": random.choice(["SCHEDULED", "IN_PLAY", "FINISHED"]),
+            "minute": random.randint(1, 90),
+            "utcDate": "2026-10-17T14:00:00Z",
+        })
+    return {"matches": matches}
+
+
+def exchange_payload():
+    rates = {code: round(random.uniform(0.001, 2.0), 6) for code in
+             ['USD', 'EUR', 'GBP', 'INR', 'SAR', 'AED', 'MYR', 'SGD', 'JPY', 'CNY', 'AUD', 'CAD', 'CHF', 'NZD']}
+    return {"result": "success", "conversion_rates": {"BDT": 1, **rates},
+            "time_last_update_utc": "Sat, 17 Oct 2026 00:00:01 +0000"}
+
+
+UPSTREAM_PAYLOADS = {
+    "api.cricapi.com": cricket_payload,
+    "newsdata.io": news_payload,
+    "api.football-data.org": football_payload,
+    "v6.exchangerate-api.com": exchange_payload,
+}
+
+
+class FakeUpstreams:
+    """Async httpx handler serving canned payloads for the four data APIs"""
+
+    def __init__(self, latency: float = 0.15, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = {host: 0 for host in UPSTREAM_PAYLOADS}
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if host not in UPSTREAM_PAYLOADS:
+            return httpx.Response(404, json={"error": f"unexpected host {host}"})
+        self.calls[host] += 1
+        await asyncio.sleep(self.latency)
+        if random.random() < self.error_rate:
+            return httpx.Response(503, json={"status": "error"})
+        return httpx.Response(200, json=UPSTREAM_PAYLOADS[host]())
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self)
+
+
+def install_fakes(server, upstreams: FakeUpstreams):
+    """Point an imported server module at the in-memory stand-ins.
+
+    Must run before the app's startup hooks so the write-behind buffer and
+    the shared HTTP client pick up the fakes.
+    """
+    server.client = AsyncMongoMockClient(tz_aware=True)
+    server.db = server.client["bdask_benchmark"]
+    server.LlmChat = FakeLlmChat
+    server.UserMessage = FakeUserMessage
+    server.http_client = httpx.AsyncClient(
+        transport=server.InstrumentedTransport(upstreams.transport()),
+        timeout=httpx.Timeout(10.0, connect=5.0)
+    )
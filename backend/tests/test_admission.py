@@ -0,0 +1,124 @@
+"""
+BdAsk.com Backend Admission Control Tests
+Unit tests for the LLM concurrency limiter and per-session turn
+serialization. Needs no server or database.
+"""
+import asyncio
+
+import pytest
+
+from admission import AdmissionRejected, ConcurrencyLimiter, SessionSerializer
+
+
+async def hold(limiter: ConcurrencyLimiter, seconds: float):
+    async with limiter.slot():
+        await asyncio.sleep(seconds)
+
+
+def assert_no_leaked_permits(limiter: ConcurrencyLimiter):
+    assert limiter.in_flight == 0
+    assert limiter.waiting == 0
+    assert limiter._semaphore._value == limiter.max_in_flight
+
+
+class TestConcurrencyLimiter:
+    """Tests for ConcurrencyLimiter"""
+
+    def test_rejects_when_queue_is_full(self):
+        """Test that a call beyond max_in_flight + max_waiting gets 503 with Retry-After"""
+        limiter = ConcurrencyLimiter(max_in_flight=2, max_waiting=1, wait_timeout=5)
+
+        async def run():
+            calls = [asyncio.create_task(hold(limiter, 0.1)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            assert (limiter.in_flight, limiter.waiting) == (2, 1)
+            with pytest.raises(AdmissionRejected) as rejected:
+                await hold(limiter, 0.1)
+            await asyncio.gather(*calls)
+            return rejected.value
+
+        error = asyncio.run(run())
+        assert error.status_code == 503
+        assert int(error.headers["Retry-After"]) >= 1
+        assert limiter.rejected == 1
+        assert_no_leaked_permits(limiter)
+
+    def test_rejects_after_wait_deadline(self):
+        """Test that a queued call that can't get a slot in wait_timeout is rejected"""
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_waiting=10, wait_timeout=0.05)
+
+        async def run():
+            running = asyncio.create_task(hold(limiter, 0.2))
+            await asyncio.sleep(0.01)
+            with pytest.raises(AdmissionRejected) as rejected:
+                await hold(limiter, 0.1)
+            await running
+            return rejected.value
+
+        error = asyncio.run(run())
+        assert error.status_code == 503
+        assert "Retry-After" in error.headers
+        assert_no_leaked_permits(limiter)
+
+    def test_failing_calls_release_their_slot(self):
+        """Test that an exception inside a slot doesn't leak the permit"""
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_waiting=0, wait_timeout=1)
+
+        async def fail():
+            async with limiter.slot():
+                raise RuntimeError("model error")
+
+        async def run():
+            for _ in range(3):
+                with pytest.raises(RuntimeError):
+                    await fail()
+
+        asyncio.run(run())
+        assert_no_leaked_permits(limiter)
+
+
+class TestSessionSerializer:
+    """Tests for SessionSerializer"""
+
+    def test_turns_of_a_session_run_one_at_a_time(self):
+        """Test that a session's turns never overlap and its lock is dropped afterwards"""
+        turns = SessionSerializer(max_pending=5, wait_timeout=5)
+        active = []
+        overlaps = []
+
+        async def turn(session_id: str):
+            async with turns.turn(session_id):
+                active.append(session_id)
+                overlaps.append(active.count(session_id) > 1)
+                await asyncio.sleep(0.01)
+                active.remove(session_id)
+
+        async def run():
+            await asyncio.gather(*[turn("a") for _ in range(4)], *[turn("b") for _ in range(2)])
+
+        asyncio.run(run())
+        assert not any(overlaps)
+        assert len(turns) == 0
+
+    def test_rejects_turns_beyond_max_pending(self):
+        """Test that a session with max_pending turns waiting turns away the next with 429"""
+        turns = SessionSerializer(max_pending=1, wait_timeout=5)
+
+        async def turn():
+            async with turns.turn("a"):
+                await asyncio.sleep(0.05)
+
+        async def run():
+            queued = [asyncio.create_task(turn()) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            with pytest.raises(AdmissionRejected) as rejected:
+                await turn()
+            await asyncio.gather(*queued)
+            return rejected.value
+
+        assert asyncio.run(run()).status_code == 429
+        assert len(turns) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -2,10 +2,12 @@
 BdAsk.com Backend API Tests
 Tests chat, translation, and status endpoints
 """
+import json
 import pytest
 import requests
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
 
@@ -40,6 +42,19 @@ class TestHealthAndStatus:
         assert isinstance(data, list)
         print(f"Status list count: {len(data)}")
 
+    def test_metrics(self):
+        """Test the Prometheus endpoint exports running totals as counters"""
+        requests.get(f"{BASE_URL}/api/cricket/live")
+        response = requests.get(f"{BASE_URL}/api/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        for name in ["bdask_cache_requests", "bdask_feed_not_modified", "bdask_feed_fallbacks",
+                     "bdask_circuit_rejected", "bdask_llm_rejected"]:
+            assert f"# TYPE {name}_total counter" in text
+        assert 'bdask_cache_requests_total{cache="cricket"' in text
+        assert "bdask_http_request_duration_seconds_bucket" in text
+
 
 class TestChatEndpoints:
     """Tests for chat session and message endpoints"""
@@ -94,6 +109,98 @@ class TestChatEndpoints:
         # Cleanup - delete session
         requests.delete(f"{BASE_URL}/api/chat/session/{session_id}")
     
+    def test_concurrent_sends_same_session_are_serialized(self):
+        """Test that overlapping sends on one session never interleave turns"""
+        session_response = requests.post(
+            f"{BASE_URL}/api/chat/session",
+            json={"title": "TEST_serialized"}
+        )
+        session_id = session_response.json()["id"]
+        
+        def send(text):
+            return requests.post(
+                f"{BASE_URL}/api/chat/send",
+                json={"session_id": session_id, "message": text},
+                timeout=60
+            )
+        
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            responses = list(pool.map(send, ["প্রথম প্রশ্ন", "দ্বিতীয় প্রশ্ন"]))
+        
+        for response in responses:
+            assert response.status_code in [200, 429, 503]
+            if response.status_code != 200:
+                assert "Retry-After" in response.headers
+        
+        messages = requests.get(f"{BASE_URL}/api/chat/messages/{session_id}").json()
+        roles = [m["role"] for m in messages]
+        assert roles == ["user", "assistant"] * (len(roles) // 2)
+        print(f"Serialized send statuses: {[r.status_code for r in responses]}")
+        
+        # Cleanup
+        requests.delete(f"{BASE_URL}/api/chat/session/{session_id}")
+    
+    def test_repeated_first_message_is_stored_per_session(self):
+        """Test that an opening message shared by two sessions lands in both histories"""
+        session_ids = []
+        for title in ["TEST_first_turn_a", "TEST_first_turn_b"]:
+            session_response = requests.post(f"{BASE_URL}/api/chat/session", json={"title": title})
+            session_ids.append(session_response.json()["id"])
+
+        replies = []
+        for session_id, text in zip(session_ids, ["তুমি কী কী করতে পারো?", "তুমি  কী কী করতে পারো"]):
+            response = requests.post(
+                f"{BASE_URL}/api/chat/send",
+                json={"session_id": session_id, "message": text},
+                timeout=60
+            )
+            assert response.status_code == 200
+            replies.append(response.json()["response"])
+
+        for session_id, reply in zip(session_ids, replies):
+            messages = requests.get(f"{BASE_URL}/api/chat/messages/{session_id}").json()
+            assert [m["role"] for m in messages] == ["user", "assistant"]
+            assert messages[1]["content"] == reply
+        print(f"First-turn replies identical: {replies[0] == replies[1]}")
+
+        # Cleanup
+        for session_id in session_ids:
+            requests.delete(f"{BASE_URL}/api/chat/session/{session_id}")
+
+    def test_stream_chat_message(self):
+        """Test streaming a reply over SSE and that it is persisted"""
+        session_response = requests.post(
+            f"{BASE_URL}/api/chat/session",
+            json={"title": "TEST_stream_chat"}
+        )
+        session_id = session_response.json()["id"]
+        
+        response = requests.post(
+            f"{BASE_URL}/api/chat/stream",
+            json={
+                "session_id": session_id,
+                "message": "হ্যালো"
+            },
+            stream=True,
+            timeout=30
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        
+        events = [line[len("event: "):] for line in response.iter_lines(decode_unicode=True)
+                  if line and line.startswith("event: ")]
+        assert events[0] == "start"
+        assert "token" in events
+        assert events[-1] == "done"
+        
+        # Complete reply should be stored after the stream ends
+        messages = requests.get(f"{BASE_URL}/api/chat/messages/{session_id}").json()
+        assert [m["role"] for m in messages] == ["user", "assistant"]
+        print(f"Stream events: {len(events)}")
+        
+        # Cleanup
+        requests.delete(f"{BASE_URL}/api/chat/session/{session_id}")
+    
     def test_get_chat_messages(self):
         """Test getting messages for a session"""
         # Create a session first
@@ -113,6 +220,86 @@ class TestChatEndpoints:
         # Cleanup
         requests.delete(f"{BASE_URL}/api/chat/session/{session_id}")
     
+    def test_get_chat_sessions_paginated(self):
+        """Test keyset pagination over the session list"""
+        response = requests.get(f"{BASE_URL}/api/chat/sessions", params={"limit": 1})
+        assert response.status_code == 200
+        first_page = response.json()
+        assert len(first_page) <= 1
+        assert response.headers["X-Has-More"] in ["true", "false"]
+        
+        if response.headers["X-Has-More"] == "true":
+            response = requests.get(
+                f"{BASE_URL}/api/chat/sessions",
+                params={"limit": 1, "before": response.headers["X-Before-Cursor"]}
+            )
+            assert response.status_code == 200
+            second_page = response.json()
+            assert second_page[0]["id"] != first_page[0]["id"]
+    
+    def test_get_chat_messages_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        response = requests.get(
+            f"{BASE_URL}/api/chat/messages/nonexistent-session-id",
+            params={"before": "not-a-cursor"}
+        )
+        assert response.status_code == 400
+    
+    def test_search_chat_messages(self):
+        """Test that search finds a Bengali message from its Banglish spelling"""
+        session_response = requests.post(
+            f"{BASE_URL}/api/chat/session",
+            json={"title": "TEST_search"}
+        )
+        session_id = session_response.json()["id"]
+        requests.post(
+            f"{BASE_URL}/api/chat/send",
+            json={"session_id": session_id, "message": "আমার পাসপোর্ট কিভাবে নবায়ন করবো?"},
+            timeout=60
+        )
+
+        response = requests.get(
+            f"{BASE_URL}/api/chat/search",
+            params={"q": "passport", "session_id": session_id}
+        )
+        assert response.status_code == 200
+        results = response.json()
+        assert any(r["role"] == "user" and "পাসপোর্ট" in r["snippet"] for r in results)
+        for r in results:
+            for start, end in r["highlights"]:
+                assert 0 <= start < end <= len(r["snippet"])
+        print(f"Search returned {len(results)} results")
+
+        # Conjuncts: ya-phala (ন্য) and ksha (ক্ষ)
+        requests.post(
+            f"{BASE_URL}/api/chat/send",
+            json={"session_id": session_id, "message": "ধন্যবাদ, শিক্ষা বৃত্তির খবর কী?"},
+            timeout=60
+        )
+        for query, word in [("dhonnobad", "ধন্যবাদ"), ("shikkha", "শিক্ষা")]:
+            response = requests.get(
+                f"{BASE_URL}/api/chat/search",
+                params={"q": query, "session_id": session_id}
+            )
+            assert response.status_code == 200
+            assert any(r["role"] == "user" and word in r["snippet"] for r in response.json()), query
+
+        # Two-letter skeletons are too common to match on: "hello" must not find "হলো"
+        requests.post(
+            f"{BASE_URL}/api/chat/send",
+            json={"session_id": session_id, "message": "আজকের কাজ শেষ হলো"},
+            timeout=60
+        )
+        response = requests.get(
+            f"{BASE_URL}/api/chat/search",
+            params={"q": "hello", "session_id": session_id}
+        )
+        assert response.status_code == 200
+        assert not any(r["role"] == "user" for r in response.json())
+
+        # Cleanup
+        requests.delete(f"{BASE_URL}/api/chat/session/{session_id}")
+
     def test_delete_chat_session(self):
         """Test deleting a chat session"""
         # Create a session first
@@ -129,6 +316,24 @@ class TestChatEndpoints:
         assert "message" in data
         print(f"Session deleted: {session_id}")
 
+    def test_deleted_session_history_is_gone(self):
+        """Deleting a session removes its live and archived messages"""
+        session_id = requests.post(
+            f"{BASE_URL}/api/chat/session",
+            json={"title": "TEST_delete_history"}
+        ).json()["id"]
+        requests.post(
+            f"{BASE_URL}/api/chat/send",
+            json={"session_id": session_id, "message": "হ্যালো"},
+            timeout=60
+        )
+
+        requests.delete(f"{BASE_URL}/api/chat/session/{session_id}")
+        response = requests.get(f"{BASE_URL}/api/chat/messages/{session_id}")
+        assert response.status_code == 200
+        assert response.json() == []
+        assert response.headers["X-Has-More"] == "false"
+
 
 class TestTranslationEndpoint:
     """Tests for the translation API endpoint"""
@@ -185,6 +390,36 @@ class TestTranslationEndpoint:
         assert "translated_text" in data
         print(f"Translation: नमस्ते -> {data['translated_text']}")
     
+    def test_translate_repeat_is_cached(self):
+        """Test that repeating a translation is served from the cache"""
+        payload = {"text": "TEST cached phrase", "source": "en", "target": "bn"}
+        first = requests.post(f"{BASE_URL}/api/translate", json=payload, timeout=30)
+        assert first.status_code == 200
+        
+        before = requests.get(f"{BASE_URL}/api/translate/cache/stats").json()
+        second = requests.post(f"{BASE_URL}/api/translate", json=payload, timeout=30)
+        assert second.status_code == 200
+        assert second.json()["translated_text"] == first.json()["translated_text"]
+        
+        after = requests.get(f"{BASE_URL}/api/translate/cache/stats").json()
+        assert after["misses"] == before["misses"]
+        print(f"Translation cache stats: {after}")
+    
+    def test_translate_batch(self):
+        """Test translating several segments in one request keeps their order"""
+        segments = ["Hello", "Good morning", "Hello", "Thank you"]
+        response = requests.post(
+            f"{BASE_URL}/api/translate/batch",
+            json={"segments": segments, "source": "en", "target": "bn"},
+            timeout=60
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["translations"]) == len(segments)
+        assert data["translations"][0]["translated_text"] == data["translations"][2]["translated_text"]
+        assert all(t["target"] == "bn" for t in data["translations"])
+        print(f"Batch translation: {[t['translated_text'] for t in data['translations']]}")
+    
     def test_translate_empty_text(self):
         """Test that empty text still returns a response (or appropriate error)"""
         response = requests.post(
@@ -202,6 +437,160 @@ class TestTranslationEndpoint:
         print(f"Empty text response status: {response.status_code}")
 
 
+class TestFeedEndpoints:
+    """Tests for HTTP caching of the live data feeds"""
+
+    def test_feed_conditional_get(self):
+        """Test that a feed revalidated with its ETag returns an empty 304"""
+        for path in ["/api/exchange/rates", "/api/news"]:
+            response = requests.get(f"{BASE_URL}{path}")
+            if response.status_code != 200:
+                print(f"{path} unavailable: {response.status_code}")
+                continue
+            etag = response.headers.get("ETag")
+            assert etag
+            assert "max-age=" in response.headers.get("Cache-Control", "")
+
+            revalidated = requests.get(f"{BASE_URL}{path}", headers={"If-None-Match": etag})
+            assert revalidated.status_code in [200, 304]  # 200 if the feed refreshed meanwhile
+            if revalidated.status_code == 304:
+                assert revalidated.content == b""
+            print(f"{path} revalidation status: {revalidated.status_code}")
+
+    def test_news_cursors(self):
+        """Test that news pages back with `before` and only returns newer articles for `since`"""
+        response = requests.get(f"{BASE_URL}/api/news", params={"limit": 5})
+        if response.status_code != 200:
+            print(f"News unavailable: {response.status_code}")
+            return
+        data = response.json()
+        if not data["articles"]:
+            return
+        shown = {a["id"] for a in data["articles"]}
+
+        older = requests.get(f"{BASE_URL}/api/news", params={"limit": 5, "before": data["beforeCursor"]})
+        assert older.status_code == 200
+        assert not shown & {a["id"] for a in older.json()["articles"]}
+
+        newer = requests.get(f"{BASE_URL}/api/news", params={"since": data["sinceCursor"]})
+        assert newer.status_code == 200
+        assert not shown & {a["id"] for a in newer.json()["articles"]}
+        print(f"Older: {len(older.json()['articles'])}, newer: {len(newer.json()['articles'])}")
+
+    def test_live_stream_snapshot(self):
+        """Test that a live score stream opens with a snapshot of every match"""
+        response = requests.get(f"{BASE_URL}/api/live/cricket/stream", stream=True, timeout=30)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                break
+        response.close()
+        assert event == "snapshot"
+        frame = json.loads(line[len("data: "):])
+        assert frame["type"] == "snapshot"
+        assert isinstance(frame["matches"], list)
+        print(f"Live snapshot: {len(frame['matches'])} matches, version {frame['version']}")
+
+    def test_live_stream_unknown_feed(self):
+        """Test that an unknown live feed is a 404"""
+        response = requests.get(f"{BASE_URL}/api/live/hockey/stream", timeout=10)
+        assert response.status_code == 404
+
+    def test_news_invalid_cursor(self):
+        """Test that a malformed news cursor is rejected"""
+        response = requests.get(f"{BASE_URL}/api/news", params={"since": "not-a-cursor"})
+        assert response.status_code in [400, 500, 504]  # 5xx if the news API is down
+
+    def test_feed_is_compressed(self):
+        """Test that a large feed response is gzip-compressed when accepted"""
+        response = requests.get(f"{BASE_URL}/api/news", headers={"Accept-Encoding": "gzip"})
+        if response.status_code == 200 and len(response.content) >= 1024:
+            assert response.headers.get("Content-Encoding") == "gzip"
+            assert "articles" in response.json()
+
+    def test_upstream_quota(self):
+        """Test the remaining request budget is reported per provider"""
+        response = requests.get(f"{BASE_URL}/api/upstream/quota")
+        assert response.status_code == 200
+        providers = response.json()["providers"]
+        assert set(providers) == {"cricapi", "newsdata", "football-data", "exchangerate-api"}
+        for quota in providers.values():
+            if quota["dailyLimit"] is not None:
+                assert 0 <= quota["remainingToday"] <= quota["dailyLimit"]
+        print(f"cricapi calls left today: {providers['cricapi']['remainingToday']}")
+
+    def test_exchange_convert(self):
+        """Test cross-rate conversion between two non-BDT currencies"""
+        response = requests.get(f"{BASE_URL}/api/exchange/convert", params={"from": "USD", "to": "EUR", "amount": 10})
+        if response.status_code == 200:
+            data = response.json()
+            assert data["from"] == "USD" and data["to"] == "EUR"
+            assert abs(data["result"] - data["rate"] * 10) < 1e-9
+            print(f"10 USD = {data['result']:.2f} EUR")
+        else:
+            assert response.status_code in [500, 504]  # exchange API down or not configured
+
+    def test_exchange_convert_unknown_currency(self):
+        """Test that an unknown currency code is rejected"""
+        response = requests.get(f"{BASE_URL}/api/exchange/convert", params={"from": "XYZ", "to": "BDT"})
+        assert response.status_code in [400, 500, 504]
+
+    def test_exchange_history(self):
+        """Test the weekly USD/BDT history series"""
+        response = requests.get(f"{BASE_URL}/api/exchange/history", params={"currency": "USD", "interval": "weekly"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["quote"] == "BDT"
+        for point in data["points"]:
+            assert point["min"] <= point["rate"] <= point["max"]
+        print(f"{len(data['points'])} weekly USD/BDT points")
+
+
+class TestPrayerTimes:
+    """Tests for the computed prayer time tables"""
+
+    def test_prayer_times_today(self):
+        """Test today's prayer times for Dhaka are in order"""
+        response = requests.get(f"{BASE_URL}/api/prayer/times", params={"district": "Dhaka"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["district"]["id"] == "dhaka"
+        timings = data["days"][0]["timings"]
+        order = [timings[p] for p in ["Fajr", "Sunrise", "Dhuhr", "Asr", "Maghrib", "Isha"]]
+        assert order == sorted(order)
+        print(f"Dhaka: {timings}")
+
+    def test_prayer_times_hanafi_asr_is_later(self):
+        """Test the Hanafi school puts Asr after the standard time"""
+        params = {"district": "sylhet", "date": "2026-06-21"}
+        standard = requests.get(f"{BASE_URL}/api/prayer/times", params=params).json()
+        hanafi = requests.get(f"{BASE_URL}/api/prayer/times", params={**params, "school": "hanafi"}).json()
+        assert hanafi["days"][0]["timings"]["Asr"] > standard["days"][0]["timings"]["Asr"]
+        assert hanafi["days"][0]["timings"]["Fajr"] == standard["days"][0]["timings"]["Fajr"]
+
+    def test_prayer_times_range_crosses_year(self):
+        """Test a multi-day range spanning New Year"""
+        response = requests.get(f"{BASE_URL}/api/prayer/times", params={"district": "barisal", "date": "2026-12-30", "days": 4})
+        assert response.status_code == 200
+        assert [d["date"] for d in response.json()["days"]] == ["2026-12-30", "2026-12-31", "2027-01-01", "2027-01-02"]
+
+    def test_prayer_districts(self):
+        """Test that all 64 districts are listed"""
+        response = requests.get(f"{BASE_URL}/api/prayer/districts")
+        assert response.status_code == 200
+        assert len(response.json()["districts"]) == 64
+
+    def test_prayer_times_invalid(self):
+        """Test unknown districts and methods are rejected"""
+        assert requests.get(f"{BASE_URL}/api/prayer/times", params={"district": "atlantis"}).status_code == 404
+        assert requests.get(f"{BASE_URL}/api/prayer/times", params={"method": "nope"}).status_code == 400
+
+
 class TestAPIValidation:
     """Tests for API validation and error handling"""
     
@@ -223,6 +612,14 @@ class TestAPIValidation:
         assert response.status_code == 422  # Validation error
         print(f"Missing session_id validation: {response.status_code}")
     
+    def test_translate_batch_empty_segments(self):
+        """Test that a batch with no segments is rejected"""
+        response = requests.post(
+            f"{BASE_URL}/api/translate/batch",
+            json={"segments": [], "source": "en", "target": "bn"}
+        )
+        assert response.status_code == 422
+    
     def test_translate_missing_fields(self):
         """Test translation with missing required fields"""
         response = requests.post(
@@ -0,0 +1,104 @@
+"""
+BdAsk.com Backend Feed Cache Tests
+Unit tests for FeedCache's single-flight, stale-while-revalidate and
+last-good fallback. Needs no server or database.
+"""
+import asyncio
+
+import pytest
+
+from cache import FeedCache
+
+
+class Upstream:
+    """Fetch function returning numbered payloads, optionally after a delay or failing"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return {"version": self.calls}
+
+
+class TestFeedCache:
+    """Tests for FeedCache"""
+
+    def test_concurrent_misses_share_one_fetch(self):
+        """Test that N concurrent gets of a cold key cause a single fetch"""
+        cache = FeedCache("test", ttl=60)
+        upstream = Upstream(delay=0.05)
+
+        async def run():
+            return await asyncio.gather(*[cache.get("feed", upstream) for _ in range(20)])
+
+        payloads = asyncio.run(run())
+        assert upstream.calls == 1
+        assert all(payload == {"version": 1} for payload in payloads)
+        assert cache.misses == 20
+
+    def test_fresh_entry_is_served_without_fetching(self):
+        """Test that a get within the TTL is a hit"""
+        cache = FeedCache("test", ttl=60)
+        upstream = Upstream()
+
+        async def run():
+            await cache.get("feed", upstream)
+            return await cache.get("feed", upstream)
+
+        assert asyncio.run(run()) == {"version": 1}
+        assert upstream.calls == 1
+        assert cache.hits == 1
+
+    def test_stale_entry_is_served_while_it_refreshes(self):
+        """Test that a stale get returns the old payload at once and refreshes once in the background"""
+        cache = FeedCache("test", ttl=0, stale_ttl=60)
+        upstream = Upstream(delay=0.05)
+
+        async def run():
+            await cache.get("feed", upstream)
+            stale = await asyncio.gather(*[cache.get("feed", upstream) for _ in range(5)])
+            await asyncio.sleep(0.1)
+            return stale, await cache.get("feed", upstream)
+
+        stale, refreshed = asyncio.run(run())
+        assert all(payload == {"version": 1} for payload in stale)
+        assert refreshed == {"version": 2}
+        assert cache.stale_hits == 6
+        # One refresh for the five stale reads, one for the last read
+        assert upstream.calls == 3
+
+    def test_failed_refresh_serves_last_good_payload_marked_stale(self):
+        """Test that an expired entry whose refresh fails falls back to the last good payload"""
+        cache = FeedCache("test", ttl=0)
+        upstream = Upstream()
+
+        async def run():
+            good = await cache.get("feed", upstream)
+            upstream.fail = True
+            return good, await cache.get("feed", upstream), await cache.get("feed", upstream)
+
+        good, fallback, again = asyncio.run(run())
+        assert good == {"version": 1}
+        assert fallback == {"version": 1, "stale": True}
+        assert again is fallback
+        assert cache.fallbacks == 2
+
+    def test_failed_fetch_without_payload_raises(self):
+        """Test that a cold key has nothing to fall back on"""
+        cache = FeedCache("test", ttl=60)
+        upstream = Upstream()
+        upstream.fail = True
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(cache.get("feed", upstream))
+        assert cache.fallbacks == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,90 @@
+"""
+BdAsk.com Backend Chat Streaming Tests
+Runs the app in-process against the offline stand-ins in tests/fakes.py and
+checks what /api/chat/stream sends with and without a streaming provider.
+Needs no server or database.
+"""
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+import server
+from fakes import FakeCompletionStream, FakeLlmChat, FakeUpstreams, install_fakes
+
+
+async def stream_turn(session_id: str, message: str) -> list:
+    """Run one streamed turn and return its (event, data, seconds since start) frames.
+
+    Reads the handler's response body directly: httpx's ASGI transport
+    buffers whole responses, which would hide when each frame was sent.
+    """
+    start = time.monotonic()
+    response = await server.stream_chat_message(
+        server.ChatRequest(session_id=session_id, message=message), http_request=None
+    )
+    frames = []
+    async for frame in response.body_iterator:
+        event, data = frame.strip().split("\n")
+        frames.append((event[len("event: "):], json.loads(data[len("data: "):]), time.monotonic() - start))
+    return frames
+
+
+def run_session(*messages: str) -> tuple:
+    """Stream `messages` as consecutive turns of a new session"""
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            session = (await client.post("/api/chat/session", json={"title": "TEST_stream"})).json()
+            turns = [await stream_turn(session["id"], message) for message in messages]
+            stored = (await client.get(f"/api/chat/messages/{session['id']}")).json()
+            return session["id"], turns, stored
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    install_fakes(server, FakeUpstreams(latency=0.0))
+    monkeypatch.setattr(FakeLlmChat, "first_token_latency", 0.05)
+    monkeypatch.setattr(FakeLlmChat, "tokens_per_second", 100.0)
+    monkeypatch.setattr(FakeLlmChat, "reply_tokens", 40)
+    monkeypatch.setattr(server, "CHAT_RESPONSE_CACHE", False)
+
+
+class TestChatStream:
+    """Tests for SSE chat replies"""
+
+    def test_provider_tokens_are_forwarded_as_they_arrive(self, fake_llm, monkeypatch):
+        """Test that the first token frame arrives long before the reply is complete"""
+        provider = FakeCompletionStream()
+        monkeypatch.setattr(server, "LLM_STREAM_API_KEY", "test")
+        monkeypatch.setattr(server, "acompletion", provider)
+        session_id, (turn, second), stored = run_session("প্রথম প্রশ্ন", "দ্বিতীয় প্রশ্ন")
+
+        tokens = [(data["text"], at) for event, data, at in turn if event == "token"]
+        done_at = turn[-1][2]
+        assert turn[-1][0] == "done"
+        assert len(tokens) == 10
+        assert tokens[0][1] < done_at / 2
+        reply = "".join(text for text, _ in tokens)
+        assert [m["content"] for m in stored[:2]] == ["প্রথম প্রশ্ন", reply]
+
+        # The next turn, streamed or not, has the streamed one in its context
+        assert {"role": "assistant", "content": reply} in provider.requests[1]
+        assert {"role": "assistant", "content": reply} in server.chat_sessions.get(session_id).chat.messages
+        assert second[-1][0] == "done"
+
+    def test_without_stream_key_reply_is_one_frame(self, fake_llm, monkeypatch):
+        """Test that a reply the client can't stream is sent whole, not cut into words"""
+        monkeypatch.setattr(server, "LLM_STREAM_API_KEY", None)
+        _, (turn,), stored = run_session("একটি প্রশ্ন")
+
+        tokens = [data["text"] for event, data, _ in turn if event == "token"]
+        assert [event for event, _, _ in turn] == ["start", "token", "done"]
+        assert tokens == [stored[1]["content"]]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
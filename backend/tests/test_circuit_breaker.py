@@ -0,0 +1,114 @@
+"""
+BdAsk.com Backend Circuit Breaker Tests
+Unit tests for opening, half-open probing and closing of CircuitBreaker.
+Needs no server or database.
+"""
+import asyncio
+
+import pytest
+
+from admission import AdmissionRejected
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+
+
+async def call(breaker: CircuitBreaker, fail: bool = False, seconds: float = 0.0):
+    async with breaker.guard():
+        await asyncio.sleep(seconds)
+        if fail:
+            raise RuntimeError("upstream error")
+
+
+def fail_times(breaker: CircuitBreaker, times: int):
+    async def run():
+        for _ in range(times):
+            with pytest.raises(RuntimeError):
+                await call(breaker, fail=True)
+    asyncio.run(run())
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker"""
+
+    def test_opens_after_failure_threshold(self):
+        """Test that the breaker stays closed below the threshold and opens at it"""
+        breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+        fail_times(breaker, 2)
+        assert breaker.state == CLOSED
+        fail_times(breaker, 1)
+        assert breaker.state == OPEN
+
+        with pytest.raises(CircuitOpen) as rejected:
+            asyncio.run(call(breaker))
+        assert rejected.value.status_code == 503
+        assert 1 <= int(rejected.value.headers["Retry-After"]) <= 60
+        assert breaker.rejected == 1
+
+    def test_success_resets_the_failure_count(self):
+        """Test that only consecutive failures count towards the threshold"""
+        breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+        fail_times(breaker, 2)
+        asyncio.run(call(breaker))
+        fail_times(breaker, 2)
+        assert breaker.state == CLOSED
+
+    def test_slow_calls_count_as_failures(self):
+        """Test that calls slower than slow_call_seconds open the breaker"""
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60, slow_call_seconds=0.01)
+
+        async def run():
+            for _ in range(2):
+                await call(breaker, seconds=0.03)
+
+        asyncio.run(run())
+        assert breaker.state == OPEN
+
+    def test_load_shedding_is_not_a_failure(self):
+        """Test that AdmissionRejected raised inside the guard isn't counted"""
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+
+        async def run():
+            async with breaker.guard():
+                raise AdmissionRejected(503, "busy", 1)
+
+        with pytest.raises(AdmissionRejected):
+            asyncio.run(run())
+        assert breaker.state == CLOSED
+        assert breaker.failures == 0
+
+    def test_half_open_admits_exactly_one_probe(self):
+        """Test that after the reset timeout one probe goes through while others are refused"""
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+        fail_times(breaker, 1)
+
+        async def run():
+            await asyncio.sleep(0.06)
+            probe = asyncio.create_task(call(breaker, seconds=0.05))
+            await asyncio.sleep(0.01)
+            assert breaker.state == HALF_OPEN
+            with pytest.raises(CircuitOpen):
+                await call(breaker)
+            await probe
+
+        asyncio.run(run())
+        assert breaker.state == CLOSED
+        asyncio.run(call(breaker))
+
+    def test_failed_probe_reopens(self):
+        """Test that a failing half-open probe opens the breaker for another reset timeout"""
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+        fail_times(breaker, 1)
+
+        async def run():
+            await asyncio.sleep(0.06)
+            with pytest.raises(RuntimeError):
+                await call(breaker, fail=True)
+
+        asyncio.run(run())
+        assert breaker.state == OPEN
+        assert breaker.times_opened == 2
+        with pytest.raises(CircuitOpen):
+            asyncio.run(call(breaker))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,63 @@
+"""
+BdAsk.com Backend Prayer Table Cache Tests
+Checks in-process how get_prayer_table caches the yearly tables it computes.
+Needs no server or database.
+"""
+import asyncio
+
+import pytest
+
+import server
+
+
+class CountingCompute:
+    """Wraps compute_prayer_table, counting calls and failing the first `failures` of them"""
+
+    def __init__(self, compute, failures: int = 0):
+        self.compute = compute
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self, year, method, school):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("table failed")
+        return self.compute(year, method, school)
+
+
+@pytest.fixture
+def compute(monkeypatch):
+    counter = CountingCompute(server.compute_prayer_table)
+    monkeypatch.setattr(server, "compute_prayer_table", counter)
+    server.prayer_tables.pop((2031, "karachi", "standard"))
+    yield counter
+    server.prayer_tables.pop((2031, "karachi", "standard"))
+
+
+class TestPrayerTableCache:
+    """Tests for the yearly prayer table cache"""
+
+    def test_failure_is_not_cached(self, compute):
+        """Test that a failed computation is retried by the next request"""
+        compute.failures = 1
+
+        async def run():
+            with pytest.raises(RuntimeError):
+                await server.get_prayer_table(2031, "karachi", "standard")
+            return await server.get_prayer_table(2031, "karachi", "standard")
+
+        assert asyncio.run(run()) is not None
+        assert compute.calls == 2
+
+    def test_concurrent_requests_share_one_computation(self, compute):
+        """Test that first requests arriving together wait on the same task"""
+        async def run():
+            return await asyncio.gather(*[server.get_prayer_table(2031, "karachi", "standard") for _ in range(5)])
+
+        tables = asyncio.run(run())
+        assert all(table is tables[0] for table in tables)
+        assert compute.calls == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,79 @@
+"""
+BdAsk.com Backend Upstream Fallback Tests
+Runs the app in-process against the offline stand-ins in tests/fakes.py and
+checks that a failing provider is counted by its circuit breaker while its
+feed keeps serving the last good payload. Needs no server or database.
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import server
+from fakes import FakeUpstreams, install_fakes
+
+
+def fetch_twice(path: str, upstreams: FakeUpstreams) -> tuple:
+    """GET `path` once with a healthy upstream and once with a failing one"""
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            upstreams.error_rate = 0.0
+            good = await client.get(path)
+            upstreams.error_rate = 1.0
+            failed = await client.get(path)
+            return good, failed
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def upstreams():
+    fake = FakeUpstreams(latency=0.0)
+    install_fakes(server, fake)
+    return fake
+
+
+class TestUpstreamFallback:
+    """Tests for last-good fallbacks when a provider returns errors"""
+
+    def test_cricket_error_serves_last_good_payload(self, upstreams):
+        """Test that a cricapi 503 keeps the previous scores, flagged stale"""
+        breaker = server.upstream_breakers["cricapi"]
+        failures = breaker.failures
+        good, failed = fetch_twice("/api/cricket/live", upstreams)
+
+        assert good.status_code == 200
+        assert good.json()["total"] > 0
+        assert "stale" not in good.json()
+        assert failed.status_code == 200
+        data = failed.json()
+        assert data["stale"] is True
+        assert data["matches"] == good.json()["matches"]
+        assert breaker.failures == failures + 1
+
+    def test_football_error_serves_last_good_payload(self, upstreams):
+        """Test that every competition failing counts as one failed fetch"""
+        breaker = server.upstream_breakers["football-data"]
+        failures = breaker.failures
+        good, failed = fetch_twice("/api/football/live", upstreams)
+
+        assert good.status_code == 200
+        assert failed.status_code == 200
+        assert failed.json()["stale"] is True
+        assert failed.json()["matches"] == good.json()["matches"]
+        assert breaker.failures == failures + 1
+
+    def test_exchange_error_page_is_a_bad_gateway(self, upstreams, monkeypatch):
+        """Test that an HTML 5xx page from the exchange API is a 502, not a JSON decode error"""
+        page = httpx.MockTransport(lambda request: httpx.Response(503, html="<h1>Service Unavailable</h1>"))
+        monkeypatch.setenv("EXCHANGE_API_KEY", "test")
+        monkeypatch.setattr(server, "http_client", httpx.AsyncClient(transport=page))
+
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(server.fetch_exchange_rates())
+        assert error.value.status_code == 502
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
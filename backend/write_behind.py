@@ -0,0 +1,121 @@
+"""Write-behind buffer for chat persistence"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+class ChatWriteBehind:
+    """Buffers chat message inserts and session touches, flushing them in bulk.
+
+    Each flush is at most one insert_many into chat_messages and one
+    bulk_write into chat_sessions, however many turns were buffered.
+
+    Delivery guarantees:
+    - Writes are acknowledged to the caller before they reach MongoDB, so a
+      read issued right after a turn may not see it until the next flush
+      (at most `flush_interval` seconds later).
+    - A graceful shutdown (`close()`) drains the buffer.
+    - A crash loses whatever is still buffered (at-most-once).
+    - Batches that fail for transient reasons are retried on the next flush;
+      documents MongoDB rejects outright (e.g. duplicate ids) are dropped and
+      logged. At most `max_pending` messages are held, oldest dropped first.
+    """
+
+    def __init__(self, db, flush_interval: float = 0.25, max_batch: int = 500, max_pending: int = 50000):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._messages = []
+        self._touched = {}  # session_id -> latest updated_at
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()  # one flush at a time, so flush() waits out one in progress
+        self._task: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def add_message(self, doc: dict):
+        self._messages.append(doc)
+        overflow = len(self._messages) - self.max_pending
+        if overflow > 0:
+            del self._messages[:overflow]
+            self.dropped += overflow
+            logger.error(f"Write-behind buffer full, dropped {overflow} messages")
+        if len(self._messages) >= self.max_batch:
+            self._wakeup.set()
+
+    def touch_session(self, session_id: str, when: datetime):
+        current = self._touched.get(session_id)
+        if current is None or when > current:
+            self._touched[session_id] = when
+
+    def __len__(self) -> int:
+        return len(self._messages) + len(self._touched)
+
+    async def flush(self):
+        """Write everything buffered so far, waiting for a flush already in progress"""
+        async with self._flush_lock:
+            await self._flush()
+
+    async def _flush(self):
+        messages, self._messages = self._messages, []
+        touched, self._touched = self._touched, {}
+        if messages:
+            try:
+                await self.db.chat_messages.insert_many(messages, ordered=False)
+                self.flushed += len(messages)
+            except BulkWriteError as e:
+                failed = len(e.details.get("writeErrors", []))
+                self.flushed += len(messages) - failed
+                self.dropped += failed
+                logger.error(f"Write-behind dropped {failed} rejected messages")
+            except Exception:
+                self._messages[:0] = messages
+                self._merge_touched(touched)
+                raise
+        if touched:
+            try:
+                await self.db.chat_sessions.bulk_write(
+                    [UpdateOne({"id": sid}, {"$max": {"updated_at": when}}) for sid, when in touched.items()],
+                    ordered=False
+                )
+            except Exception:
+                self._merge_touched(touched)
+                raise
+
+    def _merge_touched(self, touched: dict):
+        for session_id, when in touched.items():
+            self.touch_session(session_id, when)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Write-behind flush failed, will retry: {str(e)}")
+
+    async def close(self):
+        """Stop the background flusher and drain the buffer"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
@@ -1,11 +1,11 @@
 /**
  * Prayer Times Service
- * Uses free Aladhan API for accurate Islamic prayer times
+ * Times are computed by the backend for all 64 districts (Karachi method)
  */
 
 import axios from 'axios';
 
-const ALADHAN_API = 'https://api.aladhan.com/v1';
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 
 // Bangladesh cities with coordinates
 export const BD_CITIES = [
@@ -46,6 +46,12 @@ const DEMO_PRAYER_TIMES = {
   nextPrayer: 'Maghrib'
 };
 
+// Convert to Bengali numerals
+const bengaliNumerals = ['০', '১', '২', '৩', '৪', '৫', '৬', '৭', '৮', '৯'];
+const toBengali = (num) => {
+  return num.toString().split('').map(d => bengaliNumerals[parseInt(d)]).join('');
+};
+
 /**
  * Convert 24-hour time to 12-hour format with Bengali numerals
  */
@@ -57,12 +63,6 @@ const convertTo12Hour = (time24) => {
   const period = hour >= 12 ? 'PM' : 'AM';
   const hour12 = hour % 12 || 12;
   
-  // Convert to Bengali numerals
-  const bengaliNumerals = ['০', '১', '২', '৩', '৪', '৫', '৬', '৭', '৮', '৯'];
-  const toBengali = (num) => {
-    return num.toString().split('').map(d => bengaliNumerals[parseInt(d)]).join('');
-  };
-  
   return `${toBengali(hour12)}:${toBengali(parseInt(minutes))} ${period}`;
 };
 
@@ -88,18 +88,21 @@ const findNextPrayer = (timings) => {
 };
 
 /**
- * Fetch prayer times for a city
- * @param {string} city - City name in English
+ * Fetch today's prayer times for a district
+ * @param {string} city - District name in English
  * @returns {Promise<Object>} Prayer times object
  */
 export const fetchPrayerTimes = async (city = 'Dhaka') => {
   try {
-    const response = await axios.get(
-      `${ALADHAN_API}/timingsByCity?city=${city}&country=Bangladesh&method=1`
-    );
+    const response = await axios.get(`${BACKEND_URL}/api/prayer/times`, {
+      params: { district: city },
+      timeout: 10000
+    });
     
-    const data = response.data.data;
-    const timings = data.timings;
+    const data = response.data;
+    const today = data.days[0];
+    const timings = today.timings;
+    const hijri = today.hijri;
     
     const formattedTimings = {
       Fajr: convertTo12Hour(timings.Fajr),
@@ -113,10 +116,10 @@ export const fetchPrayerTimes = async (city = 'Dhaka') => {
     const cityInfo = BD_CITIES.find(c => c.nameEn.toLowerCase() === city.toLowerCase());
     
     return {
-      city: cityInfo?.name || city,
+      city: cityInfo?.name || data.district.name,
       cityEn: city,
       date: new Date().toLocaleDateString('bn-BD'),
-      hijriDate: `${data.date.hijri.day} ${data.date.hijri.month.en} ${data.date.hijri.year}`,
+      hijriDate: `${toBengali(hijri.day)} ${hijri.monthNameBn} ${toBengali(hijri.year)}`,
       timings: formattedTimings,
       nextPrayer: findNextPrayer(timings)
     };